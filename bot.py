@@ -26,6 +26,10 @@ intents.message_content = True
 intents.guilds = True
 intents.voice_states = True
 
+# Create the event loop up front: the client captures it at construction time
+loop = asyncio.new_event_loop()
+asyncio.set_event_loop(loop)
+
 # Initialize bot
 bot = commands.Bot(intents=intents)
 
@@ -45,6 +49,13 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+# nextcord[speed] picks up orjson automatically when it's installed
+try:
+    import orjson  # noqa: F401
+    logging.info("orjson available, using fast JSON handling")
+except ImportError:
+    logging.warning("orjson not installed, falling back to stdlib json (install nextcord[speed])")
+
 @bot.event
 async def on_ready():
     """Handle bot startup"""
@@ -76,19 +87,19 @@ async def on_ready():
 @bot.event
 async def on_voice_state_update(member: nextcord.Member, before: nextcord.VoiceState, after: nextcord.VoiceState):
     """Handle voice state updates"""
+    # Mute/deafen updates don't change who is in the channel
+    if before.channel == after.channel:
+        return
+    
     if member.guild.voice_client:
-        # Get number of human users in the channel
-        members = member.guild.voice_client.channel.members
-        human_members = [m for m in members if not m.bot]
-        
-        # If no humans left in the channel
-        if len(human_members) == 0:
+        # If no humans left in the channel (stops at the first human found)
+        if not any(not m.bot for m in member.guild.voice_client.channel.members):
             try:
                 await voice_manager.disconnect(member.guild.id)
             except Exception as e:
                 logging.error(f"Error disconnecting from voice: {e}")
 
-def load_cogs():
+async def load_cogs():
     """Load all command cogs"""
     # Get the absolute path to the commands directory
     commands_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "commands")
@@ -98,45 +109,68 @@ def load_cogs():
         return False
         
     try:
-        # Load each command file
-        for filename in os.listdir(commands_dir):
-            if filename.endswith(".py"):
-                try:
-                    bot.load_extension(f"commands.{filename[:-3]}")
-                    logging.info(f"Loaded extension: {filename[:-3]}")
-                except Exception as e:
-                    logging.error(f"Failed to load extension {filename}: {e}")
-                    return False
-        return True
+        names = [f"commands.{filename[:-3]}" for filename in os.listdir(commands_dir) if filename.endswith(".py")]
+        
+        # Extensions register commands and listeners on the bot, so load them on the loop thread
+        success = True
+        for name in names:
+            try:
+                bot.load_extension(name)
+                logging.info(f"Loaded extension: {name}")
+            except Exception as e:
+                logging.error(f"Failed to load extension {name}: {e}")
+                success = False
+        return success
     except Exception as e:
         logging.error(f"Error loading cogs: {e}")
         return False
 
+# Pending shutdown task started from the signal handler
+_shutdown_task = None
+
 # Add a function to handle graceful shutdown
-def signal_handler(sig, frame):
-    """Handle termination signals"""
-    logging.info(f"Received signal {sig}, shutting down...")
-    
-    # Stop the cache cleanup task
-    stop_cleanup_task()
+def signal_handler(sig: signal.Signals) -> None:
+    """Handle termination signals by scheduling shutdown on the running loop"""
+    logging.info(f"Received signal {sig.name}, shutting down...")
     
-    # Create a task to handle async shutdown operations
-    if not asyncio.get_event_loop().is_closed():
-        shutdown_task = asyncio.create_task(shutdown_bot())
-        # Wait a short time for shutdown to complete
-        try:
-            asyncio.get_event_loop().run_until_complete(asyncio.wait_for(shutdown_task, timeout=5.0))
-        except asyncio.TimeoutError:
-            logging.warning("Shutdown timed out, forcing exit")
+    # Schedule the async shutdown instead of blocking inside the signal handler,
+    # keeping a reference so the task isn't garbage collected mid-shutdown
+    global _shutdown_task
+    if _shutdown_task is None:
+        _shutdown_task = asyncio.create_task(shutdown_with_timeout())
+
+async def shutdown_with_timeout():
+    """Run the graceful shutdown, giving up after a short timeout"""
+    try:
+        await asyncio.wait_for(shutdown_bot(), timeout=5.0)
+    except asyncio.TimeoutError:
+        logging.warning("Shutdown timed out, forcing exit")
+        await bot.close()
+
+# Set once shutdown begins so the signal path and main()'s finally don't both run it
+_shutdown_started = False
 
 async def shutdown_bot():
-    """Handle graceful bot shutdown"""
+    """Handle graceful bot shutdown (safe to call more than once)"""
+    global _shutdown_started
+    if _shutdown_started:
+        return
+    _shutdown_started = True
+    
     logging.info("Performing graceful shutdown...")
     
-    # Disconnect from all voice channels
-    for guild in bot.guilds:
-        if guild.voice_client:
-            await guild.voice_client.disconnect()
+    # Stop the cache cleanup task
+    stop_cleanup_task()
+    
+    # Disconnect from all voice channels concurrently
+    voice_clients = [guild.voice_client for guild in bot.guilds if guild.voice_client]
+    results = await asyncio.gather(
+        *(voice_client.disconnect() for voice_client in voice_clients),
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            logging.error(f"Error disconnecting from voice during shutdown: {result}")
     
     # Shutdown the thread pool
     await shutdown_player()
@@ -146,17 +180,23 @@ async def shutdown_bot():
     
     logging.info("Shutdown complete")
 
+async def main():
+    """Load cogs, register signal handlers and run the bot on the current event loop"""
+    # Load command cogs
+    if not await load_cogs():
+        logging.error("Failed to load one or more cogs!")
+        raise SystemExit(1)
+    
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, signal_handler, sig)
+    
+    try:
+        await bot.start(DISCORD_TOKEN)
+    finally:
+        await shutdown_bot()
+
 if __name__ == "__main__":
     try:
-        # Register signal handlers
-        signal.signal(signal.SIGINT, signal_handler)
-        signal.signal(signal.SIGTERM, signal_handler)
-        
-        # Load command cogs
-        if not load_cogs():
-            logging.error("Failed to load one or more cogs!")
-            exit(1)
-            
         # Initialize voice manager
         if voice_manager is not None:
             voice_manager.setup(bot)
@@ -166,12 +206,7 @@ if __name__ == "__main__":
             exit(1)
             
         # Run the bot
-        bot.run(DISCORD_TOKEN)
+        loop.run_until_complete(main())
     except Exception as e:
         logging.error(f"Failed to start bot: {e}")
-        exit(1)
-    finally:
-        # Ensure cleanup happens
-        stop_cleanup_task()
-        if not asyncio.get_event_loop().is_closed():
-            asyncio.get_event_loop().run_until_complete(shutdown_player())
\ No newline at end of file
+        exit(1)
\ No newline at end of file
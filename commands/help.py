@@ -1,7 +1,11 @@
 import nextcord
+from typing import Optional
 from nextcord.ext import commands
+from utils.state import processing_guilds
 
 class Help(commands.Cog):
+    __slots__ = ("bot", "command_categories", "_base_embed", "_avatar_url")
+
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.command_categories = {
@@ -24,6 +28,22 @@ class Help(commands.Cog):
                 ("now", "Show information about the currently playing song")
             ]
         }
+        
+        # The command list never changes, so build the embed once and copy it per call
+        self._base_embed = nextcord.Embed(
+            title="GAANBOT Commands",
+            description="Here are all available commands grouped by category:",
+            color=nextcord.Color.blue()
+        )
+        for category, commands in self.command_categories.items():
+            self._base_embed.add_field(
+                name=category,
+                value="\n".join(f"`/{cmd}` - {desc}" for cmd, desc in commands),
+                inline=False
+            )
+        
+        # Bot avatar URL, resolved on first use since bot.user isn't set until login
+        self._avatar_url: Optional[str] = None
 
     @nextcord.slash_command(
         name="help",
@@ -34,26 +54,12 @@ class Help(commands.Cog):
         await interaction.response.defer()
         
         # Check if songs are being processed
-        music_cog = self.bot.get_cog("Music")
-        is_processing = music_cog and music_cog.processing_queues.get(interaction.guild_id, False)
+        is_processing = interaction.guild_id in processing_guilds
         
-        embed = nextcord.Embed(
-            title="GAANBOT Commands",
-            description="Here are all available commands grouped by category:",
-            color=nextcord.Color.blue()
-        )
-
-        # Add fields for each category
-        for category, commands in self.command_categories.items():
-            # Format commands for this category
-            commands_text = "\n".join(
-                f"`/{cmd}` - {desc}" for cmd, desc in commands
-            )
-            embed.add_field(
-                name=category,
-                value=commands_text,
-                inline=False
-            )
+        embed = self._base_embed.copy()
+        
+        if self._avatar_url is None and self.bot.user.avatar:
+            self._avatar_url = self.bot.user.avatar.url
         
         # Add bot information and status
         footer_text = "Use / to access commands | GAANBOT created by chaosen3"
@@ -62,7 +68,7 @@ class Help(commands.Cog):
             
         embed.set_footer(
             text=footer_text,
-            icon_url=self.bot.user.avatar.url if self.bot.user.avatar else None
+            icon_url=self._avatar_url
         )
 
         await interaction.followup.send(embed=embed)
@@ -9,26 +9,11 @@ from utils.embed_factory import EmbedFactory
 class NavigationCommands(commands.Cog):
     """Commands for navigation control (skip, stop, leave)"""
     
+    __slots__ = ("bot",)
+    
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        # Reference to the shared processing states
-        playback_cog = bot.get_cog("PlaybackCommands")
-        self.processing_states = playback_cog.processing_states if playback_cog else {}
     
-    async def is_processing(self, guild_id: int, interaction: nextcord.Interaction) -> bool:
-        """Check if the guild is currently processing songs and notify user if so"""
-        if self.processing_states.get(guild_id, False):
-            await interaction.followup.send(
-                embed=EmbedFactory.create_action_embed(
-                    "wait", 
-                    "Still processing songs... Please try again in a moment.",
-                    success=False,
-                    user=interaction.user
-                )
-            )
-            return True
-        return False
-
     @nextcord.slash_command(
         name="skip",
         description="Skip songs in the queue"
@@ -44,14 +29,9 @@ class NavigationCommands(commands.Cog):
         ----------
         position: Which song position to skip to (optional, skips one song if not specified)
         """
-        await interaction.response.defer()
-
-        if await self.is_processing(interaction.guild_id, interaction):
-            return
-
         voice_client = interaction.guild.voice_client
         if not voice_client:
-            await interaction.followup.send(
+            await interaction.response.send_message(
                 embed=EmbedFactory.create_action_embed(
                     "skip", 
                     "I'm not playing anything right now.",
@@ -62,7 +42,7 @@ class NavigationCommands(commands.Cog):
             return
 
         if not voice_client.is_playing() and not voice_client.is_paused():
-            await interaction.followup.send(
+            await interaction.response.send_message(
                 embed=EmbedFactory.create_action_embed(
                     "skip", 
                     "Nothing to skip right now.",
@@ -79,7 +59,7 @@ class NavigationCommands(commands.Cog):
         # If no position specified, skip current song
         if position is None:
             voice_client.stop()
-            await interaction.followup.send(
+            await interaction.response.send_message(
                 embed=EmbedFactory.create_action_embed(
                     "skip", 
                     f"Skipped **{current_title}**",
@@ -92,7 +72,7 @@ class NavigationCommands(commands.Cog):
         queue_length = song_queue.get_queue_length(interaction.guild_id)
         
         if queue_length == 0:
-            await interaction.followup.send(
+            await interaction.response.send_message(
                 embed=EmbedFactory.create_action_embed(
                     "skip", 
                     "The queue is empty!",
@@ -103,7 +83,7 @@ class NavigationCommands(commands.Cog):
             return
             
         if position < 1 or position > queue_length:
-            await interaction.followup.send(
+            await interaction.response.send_message(
                 embed=EmbedFactory.create_action_embed(
                     "skip", 
                     f"Invalid position. Please use a number between 1 and {queue_length}",
@@ -114,17 +94,16 @@ class NavigationCommands(commands.Cog):
             return
 
         # Get song info for the target position for better feedback
-        target_song = song_queue.get_queue(interaction.guild_id)[position-1]
-        target_title = target_song['song_info']['title'] if target_song else f"song at position {position}"
+        target_song = song_queue.peek(interaction.guild_id, position - 1)
+        target_title = target_song.title if target_song else f"song at position {position}"
 
         # Stop current song
         voice_client.stop()
         
         # Remove songs before the requested position
-        for _ in range(position - 1):
-            song_queue.pop_song(interaction.guild_id)
+        song_queue.pop_n(interaction.guild_id, position - 1)
 
-        await interaction.followup.send(
+        await interaction.response.send_message(
             embed=EmbedFactory.create_action_embed(
                 "skip", 
                 f"Skipped to **{target_title}**",
@@ -138,11 +117,9 @@ class NavigationCommands(commands.Cog):
     )
     async def stop(self, interaction: nextcord.Interaction):
         """Stop playing and clear the queue but stay in voice channel"""
-        await interaction.response.defer()
-
         voice_client = interaction.guild.voice_client
         if not voice_client:
-            await interaction.followup.send(
+            await interaction.response.send_message(
                 embed=EmbedFactory.create_action_embed(
                     "stop", 
                     "I'm not connected to a voice channel.",
@@ -160,7 +137,8 @@ class NavigationCommands(commands.Cog):
         if voice_client.is_playing() or voice_client.is_paused():
             voice_client.stop()
         
-        # Clear the queue
+        # Clear the queue and stop queueing songs from a Spotify link
+        voice_manager.cancel_processing(interaction.guild_id)
         song_queue.clear_queue(interaction.guild_id)
         
         # Clear current song info
@@ -175,7 +153,7 @@ class NavigationCommands(commands.Cog):
         elif queue_length > 0:
             details = f"Cleared {queue_length} songs from the queue"
             
-        await interaction.followup.send(
+        await interaction.response.send_message(
             embed=EmbedFactory.create_action_embed(
                 "stop", 
                 details,
@@ -189,10 +167,8 @@ class NavigationCommands(commands.Cog):
     )
     async def leave(self, interaction: nextcord.Interaction):
         """Stop playing, clear the queue, and leave the voice channel"""
-        await interaction.response.defer()
-
         if not interaction.guild.voice_client:
-            await interaction.followup.send(
+            await interaction.response.send_message(
                 embed=EmbedFactory.create_action_embed(
                     "leave", 
                     "I'm not in a voice channel.",
@@ -202,6 +178,8 @@ class NavigationCommands(commands.Cog):
             )
             return
 
+        await interaction.response.defer()
+
         # Disconnect (this will handle stopping and clearing)
         await voice_manager.disconnect(interaction.guild_id)
         
@@ -3,6 +3,8 @@ from nextcord.ext import commands
 from utils.player import player_state
 
 class NowPlaying(commands.Cog):
+    __slots__ = ("bot",)
+
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
@@ -12,69 +14,45 @@ class NowPlaying(commands.Cog):
     )
     async def now_playing(self, interaction: nextcord.Interaction):
         """Display information about the currently playing song"""
-        await interaction.response.defer()
-
-        # Get the music cog to check processing state
-        music_cog = self.bot.get_cog("Music")
-        if music_cog and music_cog.processing_queues.get(interaction.guild_id, False):
-            await interaction.followup.send("Still processing songs... Please try again in a moment.")
-            return
-
         # Get current song info
         song_info = player_state.get_song(interaction.guild_id)
         if not song_info:
-            await interaction.followup.send("No song is currently playing.")
+            await interaction.response.send_message("No song is currently playing.")
             return
 
         voice_client = interaction.guild.voice_client
         if not voice_client or (not voice_client.is_playing() and not voice_client.is_paused()):
-            await interaction.followup.send("No song is currently playing.")
+            await interaction.response.send_message("No song is currently playing.")
             return
 
         # Create progress bar
         progress_bar = player_state.create_progress_bar(interaction.guild_id)
         if not progress_bar:
-            await interaction.followup.send("Error getting playback progress.")
+            await interaction.response.send_message("Error getting playback progress.")
             return
 
-        # Create embed
-        embed = nextcord.Embed(
-            title="Now Playing",
-            description=f"[{song_info['title']}]({song_info['url']})",
-            color=nextcord.Color.blue()
-        )
+        duration = song_info['duration']
+        status = "Paused" if voice_client.is_paused() else "Playing"
+
+        # Build the whole embed payload in one pass:
+        # progress bar below the image, then song details in a row
+        payload = {
+            "title": "Now Playing",
+            "description": f"[{song_info['title']}]({song_info['url']})",
+            "color": nextcord.Color.blue().value,
+            "fields": [
+                {"name": "", "value": progress_bar, "inline": False},
+                {"name": "Uploader", "value": song_info['uploader'], "inline": True},
+                {"name": "Duration", "value": f"{duration // 60}:{duration % 60:02d}", "inline": True},
+                {"name": "Status", "value": status, "inline": True}
+            ]
+        }
 
         # Set large image (appears below title)
         if song_info['thumbnail']:
-            embed.set_image(url=song_info['thumbnail'])
-
-        # Add progress bar below image
-        embed.add_field(
-            name="",
-            value=progress_bar,
-            inline=False
-        )
-
-        # Add song details in a row
-        embed.add_field(
-            name="Uploader",
-            value=song_info['uploader'],
-            inline=True
-        )
+            payload["image"] = {"url": song_info['thumbnail']}
 
-        duration = song_info['duration']
-        embed.add_field(
-            name="Duration",
-            value=f"{duration // 60}:{duration % 60:02d}",
-            inline=True
-        )
-
-        status = "Paused" if voice_client.is_paused() else "Playing"
-        embed.add_field(
-            name="Status",
-            value=status,
-            inline=True
-        )
+        embed = nextcord.Embed.from_dict(payload)
 
         # Add requester info
         if song_info['requester']:
@@ -83,7 +61,7 @@ class NowPlaying(commands.Cog):
                 icon_url=song_info['requester'].avatar.url if song_info['requester'].avatar else None
             )
 
-        await interaction.followup.send(embed=embed)
+        await interaction.response.send_message(embed=embed)
 
 def setup(bot: commands.Bot) -> None:
     """Setup the NowPlaying cog"""
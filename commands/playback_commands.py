@@ -1,71 +1,93 @@
 import logging
 import asyncio
+import math
 import nextcord
+from typing import AsyncIterator, Optional
+from collections import deque
 from nextcord.ext import commands
 from utils.voice import voice_manager
 from utils.spotify import spotify_manager
 from utils.player import player_state
 from utils.queue import song_queue
 from utils.embed_factory import EmbedFactory
+from utils.song import SpotifyTrack
 
 class PlaybackCommands(commands.Cog):
     """Commands for basic playback control (play, pause, resume)"""
     
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.processing_states = {}  # Shared state for processing flags
     
-    async def is_processing(self, guild_id: int, interaction: nextcord.Interaction) -> bool:
-        """Check if the guild is currently processing songs and notify user if so"""
-        if self.processing_states.get(guild_id, False):
-            await interaction.followup.send(
-                embed=EmbedFactory.create_action_embed(
-                    "wait", 
-                    "Still processing songs... Please try again in a moment.",
-                    success=False,
-                    user=interaction.user
-                )
-            )
-            return True
-        return False
+    async def _yield_for_voice(self, guild_id: int) -> None:
+        """Back off while the guild's voice heartbeat latency is high"""
+        guild = self.bot.get_guild(guild_id)
+        voice_client = guild.voice_client if guild else None
+        latency = getattr(voice_client, "latency", 0.0)
+        
+        # Latency is inf until the first heartbeat ACK, which says nothing about the connection;
+        # 250ms is where Discord's own client starts flagging a bad connection
+        if math.isfinite(latency) and latency >= 0.25:
+            await asyncio.sleep(min(5.0, latency * 4))
         
-    async def _process_spotify_songs(self, guild_id: int, songs: list, user, batch_size: int = 1):
-        """Process Spotify songs in the background with proper yielding"""
+    async def _process_spotify_songs(
+        self,
+        guild_id: int,
+        songs: AsyncIterator[SpotifyTrack],
+        user,
+        previous: Optional[asyncio.Task] = None,
+        max_concurrency: int = 6
+    ):
+        """Process Spotify songs in the background as they stream in, extracting several at once"""
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def extract(song: SpotifyTrack):
+            try:
+                # Give voice heartbeats room when the connection is struggling, without holding a slot
+                await self._yield_for_voice(guild_id)
+                # The semaphore bounds how many extractions are in flight at once
+                async with semaphore:
+                    return await player_state.extract_spotify_song_info(song)
+            except Exception as e:
+                logging.error(f"Error adding song to queue: {e}")
+                return None
+
+        # Extraction tasks in playlist order; songs are queued from the front as they finish
+        pending = deque()
+        count = 0
+
+        def queue_finished() -> None:
+            while pending and pending[0].done():
+                song_info = pending.popleft().result()
+                if song_info:
+                    song_queue.add_song(guild_id, song_info, user)
+
         try:
-            # Process songs in very small batches (1-2 songs at a time)
-            for i in range(0, len(songs), batch_size):
-                try:
-                    # Get a batch of songs
-                    batch = songs[i:i + batch_size]
-                
-                    # Process each song
-                    for song in batch:
-                        try:
-                            # Let other tasks run between songs
-                            await asyncio.sleep(0)
-                        
-                            # Extract song info (this is the blocking operation)
-                            song_info = await player_state.extract_song_info(song['search_query'])
-                        
-                            # Add to queue
-                            song_queue.add_song(guild_id, song_info, user)
-                        except Exception as e:
-                            logging.error(f"Error adding song to queue: {e}")
-                
-                    # Add a larger delay between batches to let voice heartbeats process
-                    if i + batch_size < len(songs):
-                        # Give more time for heartbeats
-                        await asyncio.sleep(2)
-                except Exception as batch_error:
-                    logging.error(f"Error processing batch: {batch_error}")
-                    continue
+            # Let an earlier link finish queueing first so songs keep their request order
+            if previous and not previous.done():
+                await asyncio.wait((previous,))
+
+            # Start extracting each song as soon as Spotify returns it
+            async for song in songs:
+                pending.append(asyncio.create_task(extract(song)))
+                count += 1
+                queue_finished()
+
+            while pending:
+                await asyncio.wait((pending[0],))
+                queue_finished()
                 
         except Exception as e:
             logging.error(f"Error in background processing: {e}")
         finally:
-            # Clear processing state when done
-            self.processing_states[guild_id] = False
-            logging.info(f"Finished processing {len(songs)} Spotify songs for guild {guild_id}")
+            # Cancelled by /stop or a disconnect: take any earlier run waited on down too
+            if previous:
+                previous.cancel()
+            for task in pending:
+                task.cancel()
+            await songs.aclose()
+            # Clear processing state when done and wake playback waiting on the next song
+            voice_manager.finish_processing(guild_id)
+            logging.info(f"Finished processing {count} Spotify songs for guild {guild_id}")
 
     @nextcord.slash_command(
         name="play",
@@ -78,11 +100,12 @@ class PlaybackCommands(commands.Cog):
     ):
         """Play a song or add it to the queue"""
         await interaction.response.defer()
+        send = interaction.followup.send
 
         try:
             # Check if user is in voice channel
             if not interaction.user.voice:
-                await interaction.followup.send(
+                await send(
                     embed=EmbedFactory.create_action_embed(
                         "error", 
                         "You need to be in a voice channel!",
@@ -96,13 +119,11 @@ class PlaybackCommands(commands.Cog):
             if spotify_manager.is_spotify_url(query):
                 logging.info(f"Handling Spotify URL: {query}")
                 try:
-                    # Set processing state
-                    self.processing_states[interaction.guild_id] = True
-        
-                    songs = await spotify_manager.get_songs_from_url(query)
-                    if not songs:
-                        self.processing_states[interaction.guild_id] = False
-                        await interaction.followup.send(
+                    # Songs stream in page by page, so the first one can play while the rest load
+                    songs = spotify_manager.iter_songs_from_url(query)
+                    first_song = await anext(songs, None)
+                    if first_song is None:
+                        await send(
                             embed=EmbedFactory.create_action_embed(
                                 "spotify",
                                 "No songs found in the Spotify link.",
@@ -113,41 +134,39 @@ class PlaybackCommands(commands.Cog):
                         return
 
                     # Send acknowledgment for playlists/albums
-                    if len(songs) > 1:
-                        await interaction.followup.send(
+                    if spotify_manager.get_url_type(query) != 'track':
+                        await send(
                             embed=EmbedFactory.create_action_embed(
                                 "spotify",
-                                f"Adding {len(songs)} songs from Spotify to the queue...",
+                                "Adding songs from Spotify to the queue...",
                                 success=True,
                                 user=interaction.user
                             )
                         )
 
                     # Get YouTube info for first song and play it
-                    first_song = songs.pop(0)
-                    await voice_manager.play_song(interaction, first_song['search_query'])
+                    await voice_manager.play_song(interaction, first_song.search_query)
 
-                    # Process remaining songs in smaller batches with yielding
+                    # Process remaining songs concurrently in the background
                     voice_client = interaction.guild.voice_client
-                    if voice_client and songs:
-                        # Use a much smaller batch size (1-2 songs max per batch)
-                        batch_size = 1
-            
-                        # Create a background task to process the songs
-                        asyncio.create_task(self._process_spotify_songs(
+                    if voice_client:
+                        # Create a background task to process the songs, queued after any run still going
+                        task = asyncio.create_task(self._process_spotify_songs(
                             interaction.guild_id, 
                             songs, 
                             interaction.user,
-                            batch_size
+                            voice_manager.processing_tasks.get(interaction.guild_id)
                         ))
+                        voice_manager.track_processing(interaction.guild_id, task)
+                    else:
+                        # Not connected, so stop fetching the remaining songs
+                        await songs.aclose()
         
-                    # Clear processing state is done in the background task
+                    # Otherwise clearing processing state is done in the background task
                     return
                 except Exception as e:
-                    # Clear processing state on error
-                    self.processing_states[interaction.guild_id] = False
                     logging.error(f"Error processing Spotify URL: {e}", exc_info=True)
-                    await interaction.followup.send(
+                    await send(
                         embed=EmbedFactory.create_action_embed(
                             "error",
                             "An error occurred while processing the Spotify link. Please try again.",
@@ -161,10 +180,8 @@ class PlaybackCommands(commands.Cog):
             await voice_manager.play_song(interaction, query)
 
         except Exception as e:
-            if interaction.guild_id in self.processing_states:
-                self.processing_states[interaction.guild_id] = False
             logging.error(f"Error in play command: {e}")
-            await interaction.followup.send(
+            await send(
                 embed=EmbedFactory.create_action_embed(
                     "error", 
                     "An error occurred while trying to play the song. Please try again.",
@@ -179,11 +196,9 @@ class PlaybackCommands(commands.Cog):
     )
     async def pause(self, interaction: nextcord.Interaction):
         """Pause the current song"""
-        await interaction.response.defer()
-
         voice_client = interaction.guild.voice_client
         if not voice_client:
-            await interaction.followup.send(
+            await interaction.response.send_message(
                 embed=EmbedFactory.create_action_embed(
                     "pause", 
                     "I'm not playing anything right now.",
@@ -194,7 +209,7 @@ class PlaybackCommands(commands.Cog):
             return
 
         if voice_client.is_paused():
-            await interaction.followup.send(
+            await interaction.response.send_message(
                 embed=EmbedFactory.create_action_embed(
                     "pause", 
                     "The song is already paused!",
@@ -210,7 +225,7 @@ class PlaybackCommands(commands.Cog):
             
             if song_info:
                 title = song_info.get('title', 'current song')
-                await interaction.followup.send(
+                await interaction.response.send_message(
                     embed=EmbedFactory.create_action_embed(
                         "pause", 
                         f"Paused **{title}**",
@@ -218,7 +233,7 @@ class PlaybackCommands(commands.Cog):
                     )
                 )
             else:
-                await interaction.followup.send(
+                await interaction.response.send_message(
                     embed=EmbedFactory.create_action_embed(
                         "pause", 
                         "Paused the current song",
@@ -227,7 +242,7 @@ class PlaybackCommands(commands.Cog):
                 )
             return
 
-        await interaction.followup.send(
+        await interaction.response.send_message(
             embed=EmbedFactory.create_action_embed(
                 "pause", 
                 "Nothing is playing right now.",
@@ -242,11 +257,9 @@ class PlaybackCommands(commands.Cog):
     )
     async def resume(self, interaction: nextcord.Interaction):
         """Resume the paused song"""
-        await interaction.response.defer()
-
         voice_client = interaction.guild.voice_client
         if not voice_client:
-            await interaction.followup.send(
+            await interaction.response.send_message(
                 embed=EmbedFactory.create_action_embed(
                     "resume", 
                     "I'm not connected to a voice channel.",
@@ -257,7 +270,7 @@ class PlaybackCommands(commands.Cog):
             return
 
         if voice_client.is_playing():
-            await interaction.followup.send(
+            await interaction.response.send_message(
                 embed=EmbedFactory.create_action_embed(
                     "resume", 
                     "The song is already playing!",
@@ -273,7 +286,7 @@ class PlaybackCommands(commands.Cog):
             
             if song_info:
                 title = song_info.get('title', 'current song')
-                await interaction.followup.send(
+                await interaction.response.send_message(
                     embed=EmbedFactory.create_action_embed(
                         "resume", 
                         f"Resumed **{title}**",
@@ -281,7 +294,7 @@ class PlaybackCommands(commands.Cog):
                     )
                 )
             else:
-                await interaction.followup.send(
+                await interaction.response.send_message(
                     embed=EmbedFactory.create_action_embed(
                         "resume", 
                         "Resumed the song",
@@ -290,7 +303,7 @@ class PlaybackCommands(commands.Cog):
                 )
             return
 
-        await interaction.followup.send(
+        await interaction.response.send_message(
             embed=EmbedFactory.create_action_embed(
                 "resume", 
                 "Nothing is paused right now.",
@@ -1,6 +1,7 @@
 import nextcord
 from nextcord.ext import commands
 from utils.queue import song_queue
+from utils.state import require_idle
 
 class Queue(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -23,12 +24,6 @@ class Queue(commands.Cog):
         """
         await interaction.response.defer()
 
-        # Get the music cog to check processing state
-        music_cog = self.bot.get_cog("Music")
-        if music_cog and music_cog.processing_queues.get(interaction.guild_id, False):
-            await interaction.followup.send("Still processing songs... Please try again in a moment.")
-            return
-
         if song_queue.is_empty(interaction.guild_id):
             await interaction.followup.send("The queue is empty!")
             return
@@ -116,16 +111,11 @@ class Queue(commands.Cog):
         name="shuffle",
         description="Shuffle the song queue"
     )
+    @require_idle
     async def shuffle_queue(self, interaction: nextcord.Interaction):
         """Randomly shuffle the queue"""
         await interaction.response.defer()
 
-        # Get the music cog to check processing state
-        music_cog = self.bot.get_cog("Music")
-        if music_cog and music_cog.processing_queues.get(interaction.guild_id, False):
-            await interaction.followup.send("Still processing songs... Please try again in a moment.")
-            return
-
         if song_queue.is_empty(interaction.guild_id):
             await interaction.followup.send("The queue is empty!")
             return
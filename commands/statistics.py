@@ -1,11 +1,14 @@
 import nextcord
 import time
 import psutil
-import os
+import asyncio
+import math
+from typing import Any, Dict, List
 from datetime import datetime, timedelta
 from nextcord.ext import commands
 from utils.player import player_state
 from utils.voice import voice_manager
+from utils.spotify import spotify_manager
 from utils.cache_manager import youtube_cache, spotify_cache
 from utils.embed_factory import EmbedFactory
 
@@ -15,6 +18,9 @@ class Statistics(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.start_time = time.time()
+        self._process = psutil.Process()
+        self._memory_cache = (0.0, 0.0)  # (monotonic timestamp, RSS in MB)
+        self._memory_cache_ttl = 5  # Seconds to reuse a memory reading
 
     @nextcord.slash_command(
         name="stats",
@@ -41,44 +47,52 @@ class Statistics(commands.Cog):
             # Add bot stats
             guild_count = len(self.bot.guilds)
             
-            # Count connected voice clients
-            voice_count = 0
-            for guild in self.bot.guilds:
-                if guild.voice_client and guild.voice_client.is_connected():
-                    voice_count += 1
+            # Count connected voice clients and find the slowest heartbeat
+            voice_clients = [
+                guild.voice_client for guild in self.bot.guilds
+                if guild.voice_client and guild.voice_client.is_connected()
+            ]
+            voice_count = len(voice_clients)
+            # Clients still waiting on their first heartbeat ACK report inf, so leave them out
+            voice_latency = max(
+                (vc.latency for vc in voice_clients if math.isfinite(vc.latency)),
+                default=None
+            )
+            voice_latency_text = f"{voice_latency * 1000:.0f} ms" if voice_latency is not None else "n/a"
             
             # Get memory usage
-            process = psutil.Process(os.getpid())
-            memory_usage = process.memory_info().rss / 1024 / 1024  # Convert to MB
+            memory_usage = self._get_memory_usage()
             
             embed.add_field(
                 name="Bot Status",
                 value=f"🏠 **Servers:** {guild_count}\n"
                       f"🎵 **Active voice:** {voice_count}\n"
+                      f"📶 **Worst voice latency:** {voice_latency_text}\n"
                       f"⏱️ **Uptime:** {self._get_uptime()}\n"
                       f"💾 **Memory:** {memory_usage:.1f} MB",
                 inline=False
             )
             
             # Format YouTube cache stats
-            hit_ratio = yt_stats.get('hit_ratio', 0) * 100
+            hit_ratio = yt_stats.hit_ratio * 100
             embed.add_field(
                 name="YouTube Cache",
-                value=f"💾 **Entries:** {yt_stats.get('active_entries', 0)}\n"
+                value=f"💾 **Entries:** {yt_stats.active_entries}\n"
                       f"🎯 **Hit rate:** {hit_ratio:.1f}%\n"
-                      f"⚡ **Hits:** {yt_stats.get('hits', 0)}\n"
-                      f"❓ **Misses:** {yt_stats.get('misses', 0)}",
+                      f"⚡ **Hits:** {yt_stats.hits}\n"
+                      f"❓ **Misses:** {yt_stats.misses}",
                 inline=True
             )
             
             # Format Spotify cache stats
-            spotify_hit_ratio = spotify_stats.get('hit_ratio', 0) * 100
+            spotify_hit_ratio = spotify_stats.hit_ratio * 100
             embed.add_field(
                 name="Spotify Cache",
-                value=f"💾 **Entries:** {spotify_stats.get('active_entries', 0)}\n"
+                value=f"💾 **Entries:** {spotify_stats.active_entries}\n"
                       f"🎯 **Hit rate:** {spotify_hit_ratio:.1f}%\n"
-                      f"⚡ **Hits:** {spotify_stats.get('hits', 0)}\n"
-                      f"❓ **Misses:** {spotify_stats.get('misses', 0)}",
+                      f"⚡ **Hits:** {spotify_stats.hits}\n"
+                      f"❓ **Misses:** {spotify_stats.misses}\n"
+                      f"⏳ **Rate limited:** {spotify_manager.rate_limited_count}",
                 inline=True
             )
             
@@ -129,33 +143,8 @@ class Statistics(commands.Cog):
                 )
                 return
             
-            # Create embed
-            embed = EmbedFactory.create_basic_embed(
-                title="Recently Played Songs",
-                description=f"The last {len(history)} songs played in this server",
-                color=nextcord.Color.purple()
-            )
-            
-            # Add each song
-            for i, song in enumerate(history, 1):
-                duration = song.get('duration', 0)
-                duration_str = f"{duration // 60}:{duration % 60:02d}" if duration else "?"
-                
-                requester_name = "Unknown"
-                if song.get('requester'):
-                    requester_name = song['requester'].display_name
-                
-                embed.add_field(
-                    name=f"{i}. {song.get('title')}",
-                    value=f"**Uploader:** {song.get('uploader', 'Unknown')}\n"
-                          f"**Duration:** {duration_str}\n"
-                          f"**Requested by:** {requester_name}",
-                    inline=False
-                )
-            
-            # Add thumbnail from most recent song
-            if history[0].get('thumbnail'):
-                embed.set_thumbnail(url=history[0].get('thumbnail'))
+            # Build the embed off the event loop
+            embed = await asyncio.to_thread(self._build_history_embed, history)
             
             await interaction.followup.send(embed=embed)
             
@@ -169,24 +158,62 @@ class Statistics(commands.Cog):
                 )
             )
     
+    def _build_history_embed(self, history: List[Dict[str, Any]]) -> nextcord.Embed:
+        """Build the recently played embed (pure CPU work, safe to run in a thread)"""
+        # Create embed
+        embed = EmbedFactory.create_basic_embed(
+            title="Recently Played Songs",
+            description=f"The last {len(history)} songs played in this server",
+            color=nextcord.Color.purple()
+        )
+        
+        # Add each song
+        for i, song in enumerate(history, 1):
+            duration = song.get('duration', 0)
+            duration_str = f"{duration // 60}:{duration % 60:02d}" if duration else "?"
+            
+            requester_name = "Unknown"
+            if song.get('requester'):
+                requester_name = song['requester'].display_name
+            
+            embed.add_field(
+                name=f"{i}. {song.get('title')}",
+                value=f"**Uploader:** {song.get('uploader', 'Unknown')}\n"
+                      f"**Duration:** {duration_str}\n"
+                      f"**Requested by:** {requester_name}",
+                inline=False
+            )
+        
+        # Add thumbnail from most recent song
+        if history[0].get('thumbnail'):
+            embed.set_thumbnail(url=history[0].get('thumbnail'))
+        
+        return embed
+    
+    def _get_memory_usage(self) -> float:
+        """Get resident memory in MB, reusing readings younger than the cache TTL"""
+        now = time.monotonic()
+        timestamp, memory_usage = self._memory_cache
+        if now - timestamp > self._memory_cache_ttl:
+            memory_usage = self._process.memory_info().rss / 1024 / 1024  # Convert to MB
+            self._memory_cache = (now, memory_usage)
+        return memory_usage
+    
     def _get_uptime(self) -> str:
         """Get bot uptime in a human-readable format"""
-        uptime_seconds = time.time() - self.start_time
-        
-        days, remainder = divmod(uptime_seconds, 86400)
-        hours, remainder = divmod(remainder, 3600)
-        minutes, seconds = divmod(remainder, 60)
+        seconds = int(time.time() - self.start_time)
         
-        parts = []
-        if days > 0:
-            parts.append(f"{int(days)}d")
-        if hours > 0 or days > 0:
-            parts.append(f"{int(hours)}h")
-        if minutes > 0 or hours > 0 or days > 0:
-            parts.append(f"{int(minutes)}m")
-        parts.append(f"{int(seconds)}s")
+        days, seconds = divmod(seconds, 86400)
+        hours, seconds = divmod(seconds, 3600)
+        minutes, seconds = divmod(seconds, 60)
         
-        return " ".join(parts)
+        # Leading zero units are omitted
+        return (
+            (f"{days}d " if days else "")
+            + (f"{hours}h " if days or hours else "")
+            + (f"{minutes}m " if days or hours or minutes else "")
+            + f"{seconds}s"
+        )
 
 def setup(bot: commands.Bot) -> None:
     """Setup the Statistics cog"""
@@ -1,25 +1,31 @@
 import time
 import logging
 import asyncio
-from typing import Dict, Any, Optional, Tuple, List, TypeVar, Generic, Callable
+import heapq
+import itertools
+from typing import Dict, Any, Optional, Tuple, List, Callable, NamedTuple, Hashable
+from collections import OrderedDict
 import os
 
-T = TypeVar('T')  # Generic type for cache values
-
 # Define standard cache paths for Docker environment
 CACHE_ROOT = "/app/cache"
 YTDL_CACHE = os.path.join(CACHE_ROOT, "ytdl")
 SPOTIFY_CACHE = os.path.join(CACHE_ROOT, "spotify")
 
-class CacheEntry(Generic[T]):
-    """Entry in the cache with value and expiration time"""
-    def __init__(self, value: T, ttl: int):
-        self.value = value
-        self.expires_at = time.time() + ttl
-    
-    def is_expired(self) -> bool:
-        """Check if the cache entry has expired"""
-        return time.time() > self.expires_at
+# Cache entries are (expires_at, value) pairs; expires_at is on the time.monotonic() clock
+CacheEntry = Tuple[float, Any]
+
+
+class CacheStats(NamedTuple):
+    """Snapshot of cache statistics"""
+    total_entries: int
+    active_entries: int
+    max_size: int
+    ttl: int
+    hits: int
+    misses: int
+    hit_ratio: float
+    last_cleanup: float
 
 
 class AsyncLRUCache:
@@ -35,22 +41,28 @@ class AsyncLRUCache:
         ttl: Time to live in seconds (default: 1 hour)
         """
         self.name = name
-        self.cache: Dict[str, CacheEntry] = {}
+        self.cache: 'OrderedDict[Hashable, CacheEntry]' = OrderedDict()
         self.maxsize = maxsize
         self.ttl = ttl
         self._lock = asyncio.Lock()
+        # Computations in flight, so concurrent misses for the same key share one result
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        # Min-heap of (expires_at, tiebreak, key) so cleanup only visits expired entries
+        self._expiry_heap: List[Tuple[float, int, Hashable]] = []
+        self._heap_counter = itertools.count()
         
         # Add stats counters
         self.hits = 0
         self.misses = 0
         self.last_cleanup = 0
+        self._counters_reset = time.monotonic()
         
-    def _generate_key(self, func_name: str, args: Tuple, kwargs: Dict[str, Any]) -> str:
+    def _generate_key(self, func_name: str, args: Tuple, kwargs: Dict[str, Any]) -> Hashable:
         """Generate a unique key for the function call"""
-        # Convert args and kwargs to a string representation
-        args_str = ','.join(str(arg) for arg in args)
-        kwargs_str = ','.join(f"{k}={v}" for k, v in sorted(kwargs.items()))
-        return f"{func_name}:{args_str}:{kwargs_str}"
+        # Tuples hash in C and need no stringification; kwargs are sorted only when present
+        if not kwargs:
+            return (func_name, args)
+        return (func_name, args, tuple(sorted(kwargs.items())))
     
     async def get_or_compute(self, 
                             func: Callable,
@@ -70,46 +82,99 @@ class AsyncLRUCache:
         The cached or computed value
         """
         cache_key = self._generate_key(func.__name__, args, kwargs)
+        return await self.get_or_compute_key(cache_key, func, *args, **kwargs)
+    
+    async def get_or_compute_key(self,
+                                 cache_key: Hashable,
+                                 func: Callable,
+                                 *args,
+                                 **kwargs) -> Any:
+        """
+        Like get_or_compute, but stored under an explicit key instead of one built from the call
         
+        Concurrent misses on the same key share a single call to func.
+        """
         # Check if the key is in the cache and not expired
         entry = self.cache.get(cache_key)
-        if entry and not entry.is_expired():
-            logging.debug(f"Cache hit for {cache_key}")
+        if entry is not None and entry[0] > time.monotonic():
+            logging.debug("Cache hit for %.64r", cache_key)
             self.hits += 1
-            return entry.value
+            self.cache.move_to_end(cache_key)
+            return entry[1]
         
-        # If not in cache or expired, compute the value
-        async with self._lock:
-            # Double-check in case another coroutine has updated the cache
-            entry = self.cache.get(cache_key)
-            if entry and not entry.is_expired():
-                self.hits += 1
-                return entry.value
-            
-            # Compute the value
+        # If another coroutine is already computing this key, wait for its result
+        while (pending := self._pending.get(cache_key)) is not None:
             try:
-                logging.debug(f"Cache miss for {cache_key}, computing...")
-                self.misses += 1
-                result = await func(*args, **kwargs)
-                
-                # Update the cache
-                self.cache[cache_key] = CacheEntry(result, self.ttl)
-                
-                # Trim the cache if it exceeds the max size
-                if len(self.cache) > self.maxsize:
-                    # Remove the oldest entries
-                    oldest_keys = sorted(
-                        self.cache.keys(),
-                        key=lambda k: self.cache[k].expires_at
-                    )[:len(self.cache) - self.maxsize]
-                    
-                    for key in oldest_keys:
-                        del self.cache[key]
-                
-                return result
-            except Exception as e:
-                logging.error(f"Error computing value for cache: {e}")
+                result = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The computing coroutine was cancelled, not us: compute (or wait on a newer attempt)
+                if pending.cancelled() and not asyncio.current_task().cancelling():
+                    continue
                 raise
+            self.hits += 1
+            return result
+        
+        # Nothing awaits between the check above and registering the future, so no lock is needed
+        future = asyncio.get_running_loop().create_future()
+        # Retrieve the outcome so failures nobody waited on aren't logged as unhandled
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._pending[cache_key] = future
+        
+        # Compute the value
+        try:
+            logging.debug("Cache miss for %.64r, computing...", cache_key)
+            self.misses += 1
+            result = await func(*args, **kwargs)
+            
+            # Update the cache
+            self._store(cache_key, result, self.ttl)
+            future.set_result(result)
+            
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            logging.error(f"Error computing value for cache: {e}")
+            future.set_exception(e)
+            raise
+        finally:
+            del self._pending[cache_key]
+    
+    def _store(self, key: Hashable, value: Any, ttl: int) -> None:
+        """Insert an entry and trim the cache if it exceeds the max size"""
+        # Make room first by evicting the least recently used entry
+        if key in self.cache:
+            self.cache.move_to_end(key)
+        elif len(self.cache) >= self.maxsize:
+            self.cache.popitem(last=False)
+        
+        expires_at = time.monotonic() + ttl
+        self.cache[key] = (expires_at, value)
+        heapq.heappush(self._expiry_heap, (expires_at, next(self._heap_counter), key))
+        
+        # Overwrites and LRU evictions leave stale heap entries behind; rebuild from live entries
+        # before they outgrow the cache (in place, since cleanup_expired may hold the list)
+        if len(self._expiry_heap) > 2 * len(self.cache):
+            self._expiry_heap[:] = [
+                (entry_expires, next(self._heap_counter), entry_key)
+                for entry_key, (entry_expires, _) in self.cache.items()
+            ]
+            heapq.heapify(self._expiry_heap)
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Get a value stored under an explicit key, or None if missing or expired"""
+        entry = self.cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return entry[1]
+        self.misses += 1
+        return None
+    
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        """Store a value under an explicit key (ttl defaults to the cache TTL)"""
+        self._store(key, value, self.ttl if ttl is None else ttl)
     
     def invalidate(self, func_name: str, *args, **kwargs) -> None:
         """Invalidate a specific cache entry"""
@@ -120,45 +185,61 @@ class AsyncLRUCache:
     def clear(self) -> None:
         """Clear all cache entries"""
         self.cache.clear()
+        self._expiry_heap.clear()
         
     async def cleanup_expired(self) -> None:
         """Remove all expired entries from the cache"""
         async with self._lock:
-            expired_keys = [
-                key for key, entry in self.cache.items() 
-                if entry.is_expired()
-            ]
+            now = time.monotonic()
+            heap = self._expiry_heap
+            removed = 0
+            popped = 0
             
-            for key in expired_keys:
-                del self.cache[key]
+            while heap and heap[0][0] <= now:
+                expires_at, _, key = heapq.heappop(heap)
+                entry = self.cache.get(key)
+                # Skip keys that were evicted or stored again with a later expiry
+                if entry is not None and entry[0] == expires_at:
+                    del self.cache[key]
+                    removed += 1
+                
+                # Yield to the event loop between batches
+                popped += 1
+                if popped % 100 == 0:
+                    await asyncio.sleep(0)
                 
-            if expired_keys:
-                logging.info(f"Cleaned up {len(expired_keys)} expired entries from {self.name} cache")
+            if removed:
+                logging.info(f"Cleaned up {removed} expired entries from {self.name} cache")
+            
+            # Reset hit/miss counters hourly so the hit ratio reflects recent traffic
+            if now - self._counters_reset >= 3600:
+                self.hits = self.misses = 0
+                self._counters_reset = now
                 
             self.last_cleanup = time.time()
                 
-    def get_stats(self) -> Dict[str, Any]:
-        """Get cache statistics"""
-        now = time.time()
+    def get_stats(self) -> CacheStats:
+        """
+        Get cache statistics
+        
+        Entries past their TTL count as active until cleanup_expired() removes them
+        """
         total_entries = len(self.cache)
-        expired_entries = sum(1 for entry in self.cache.values() if entry.is_expired())
-        active_entries = total_entries - expired_entries
         
         # Calculate hit ratio
         total_requests = self.hits + self.misses
         hit_ratio = self.hits / total_requests if total_requests > 0 else 0
         
-        return {
-            "total_entries": total_entries,
-            "expired_entries": expired_entries,
-            "active_entries": active_entries,
-            "max_size": self.maxsize,
-            "ttl": self.ttl,
-            "hits": self.hits,
-            "misses": self.misses,
-            "hit_ratio": hit_ratio,
-            "last_cleanup": self.last_cleanup
-        }
+        return CacheStats(
+            total_entries=total_entries,
+            active_entries=total_entries,
+            max_size=self.maxsize,
+            ttl=self.ttl,
+            hits=self.hits,
+            misses=self.misses,
+            hit_ratio=hit_ratio,
+            last_cleanup=self.last_cleanup
+        )
 
 # Create cache directories
 def ensure_cache_dirs():
@@ -180,7 +261,7 @@ def ensure_cache_dirs():
 # Create global cache instances
 youtube_cache = AsyncLRUCache(
     name="youtube",
-    maxsize=100, 
+    maxsize=1000,  # Room for a full 500-song queue from Spotify links
     ttl=3600  # 1 hour TTL for YouTube data
 )
 
@@ -235,4 +316,5 @@ def stop_cleanup_task():
     
     if _cleanup_task and not _cleanup_task.done():
         _cleanup_task.cancel()
-        logging.info("Cancelled cache cleanup background task")
\ No newline at end of file
+        logging.info("Cancelled cache cleanup background task")
+    _cleanup_task = None
\ No newline at end of file
@@ -1,9 +1,39 @@
 import nextcord
-from typing import Optional, Dict, Any, List, Union
+from typing import Optional, Dict, Any, List, Tuple, Union
+from utils.song import Song, QueuedSong
+
+# Emoji shown in action embed titles
+_ACTION_EMOJI: Dict[str, str] = {
+    "pause": "⏸️",
+    "resume": "▶️",
+    "skip": "⏭️",
+    "stop": "⏹️",
+    "leave": "👋",
+    "clear": "🗑️",
+    "remove": "🗑️",
+    "move": "↔️",
+    "shuffle": "🔀",
+    "wait": "⏳",
+    "spotify": "🎵",
+    "connect": "🔌",
+    "error": "❌"
+}
+_ERROR_EMOJI = _ACTION_EMOJI["error"]
+
+# Action -> (emoji, title text), prebuilt for every known action
+_ACTION_TABLE: Dict[str, Tuple[str, str]] = {
+    action: (emoji, action.capitalize()) for action, emoji in _ACTION_EMOJI.items()
+}
+
+_COLOR_OK = nextcord.Color.green()
+_COLOR_ERR = nextcord.Color.red()
 
 class EmbedFactory:
     """Factory for creating consistent embeds across the bot"""
     
+    # Title/color payloads for action embeds, built once per (action, success) pair
+    _action_templates: Dict[Tuple[str, bool], Dict[str, Any]] = {}
+    
     @staticmethod
     def create_basic_embed(
         title: str, 
@@ -33,7 +63,7 @@ class EmbedFactory:
     
     @staticmethod
     def create_song_embed(
-        song_info: Dict[str, Any],
+        song_info: Union[Song, QueuedSong],
         requester: nextcord.Member,
         is_now_playing: bool = False,
         position_in_queue: int = None
@@ -43,7 +73,7 @@ class EmbedFactory:
         color = nextcord.Color.blue() if is_now_playing else nextcord.Color.green()
         
         # Create description with position if provided
-        description = f"[{song_info['title']}]({song_info['webpage_url']})"
+        description = f"[{song_info.title}]({song_info.webpage_url})"
         if position_in_queue is not None:
             description = f"#{position_in_queue} - {description}"
         
@@ -53,13 +83,13 @@ class EmbedFactory:
             color=color
         )
         
-        if song_info.get('thumbnail'):
-            embed.set_thumbnail(url=song_info['thumbnail'])
+        if song_info.thumbnail:
+            embed.set_thumbnail(url=song_info.thumbnail)
             
         # Add song details
-        embed.add_field(name="Uploader", value=song_info.get('uploader', 'Unknown'), inline=True)
+        embed.add_field(name="Uploader", value=song_info.uploader, inline=True)
         
-        duration = song_info.get('duration', 0)
+        duration = song_info.duration or 0
         embed.add_field(
             name="Duration",
             value=EmbedFactory.format_duration(duration),
@@ -82,38 +112,13 @@ class EmbedFactory:
         user: nextcord.Member = None
     ) -> nextcord.Embed:
         """Create an embed for action responses (pause, skip, stop, etc.)"""
-        # Pick emoji based on action and success
-        emoji_map = {
-            "pause": "⏸️",
-            "resume": "▶️",
-            "skip": "⏭️",
-            "stop": "⏹️",
-            "leave": "👋",
-            "clear": "🗑️",
-            "remove": "🗑️",
-            "move": "↔️",
-            "shuffle": "🔀",
-            "wait": "⏳",
-            "spotify": "🎵",
-            "connect": "🔌",
-            "error": "❌"
-        }
-        
-        emoji = emoji_map.get(action.lower(), "🎵")
-        if not success:
-            emoji = emoji_map["error"]
+        template = EmbedFactory._action_templates.get((action, success))
+        if template is None:
+            template = EmbedFactory._build_action_template(action, success)
+            EmbedFactory._action_templates[(action, success)] = template
         
-        # Pick color based on success
-        color = nextcord.Color.green() if success else nextcord.Color.red()
-        
-        # Create title with emoji
-        title = f"{emoji} {action.capitalize()}"
-        
-        embed = nextcord.Embed(
-            title=title,
-            description=details,
-            color=color
-        )
+        embed = nextcord.Embed.from_dict(template)
+        embed.description = details
         
         # Add user footer if provided
         if user:
@@ -124,7 +129,27 @@ class EmbedFactory:
         
         return embed
     
+    @staticmethod
+    def _build_action_template(action: str, success: bool) -> Dict[str, Any]:
+        """Build the static title/color payload for an action embed"""
+        # Pick emoji and title text based on action, falling back for unknown actions
+        entry = _ACTION_TABLE.get(action)
+        if entry is None:
+            entry = (_ACTION_EMOJI.get(action.lower(), "🎵"), action.capitalize())
+        emoji, title_text = entry
+        if not success:
+            emoji = _ERROR_EMOJI
+        
+        # Pick color based on success
+        color = _COLOR_OK if success else _COLOR_ERR
+        
+        # Create title with emoji
+        title = f"{emoji} {title_text}"
+        
+        return {"title": title, "color": color.value}
+    
     @staticmethod
     def format_duration(seconds: int) -> str:
         """Format seconds into MM:SS format"""
-        return f"{seconds // 60}:{seconds % 60:02d}"
\ No newline at end of file
+        minutes, seconds = divmod(int(seconds), 60)
+        return f"{minutes}:{seconds:02d}"
\ No newline at end of file
@@ -4,12 +4,18 @@ import yt_dlp
 import logging
 import asyncio
 import concurrent.futures
-from typing import Optional, Dict, Any
-from utils.cache_manager import youtube_cache, YTDL_CACHE
+import threading
+from typing import Optional, Dict, Any, Union
+from utils.cache_manager import youtube_cache, YTDL_CACHE, CacheStats
+from utils.song import Song, QueuedSong, SpotifyTrack
 
 # Create a thread pool for CPU-bound operations
 youtube_executor = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="youtube_worker")
 
+# Every possible progress bar, indexed by the number of filled segments
+_BAR_LENGTH = 15
+_BAR_TEMPLATES = tuple("▬" * i + "🔘" + "▬" * (_BAR_LENGTH - i) for i in range(_BAR_LENGTH + 1))
+
 class PlayerState:
     """Manages the state of currently playing songs across guilds"""
     def __init__(self):
@@ -38,7 +44,16 @@ class PlayerState:
             'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5',
             'options': '-vn'
         }
-        self.ytdl = yt_dlp.YoutubeDL(self.ytdl_format_options)
+        # One YoutubeDL per worker thread, since instances carry mutable state
+        self._ytdl_local = threading.local()
+
+    def _get_ytdl(self) -> yt_dlp.YoutubeDL:
+        """Get the calling thread's YoutubeDL instance, creating it on first use"""
+        ytdl = getattr(self._ytdl_local, 'ytdl', None)
+        if ytdl is None:
+            ytdl = yt_dlp.YoutubeDL(self.ytdl_format_options)
+            self._ytdl_local.ytdl = ytdl
+        return ytdl
 
     def create_progress_bar(self, guild_id: int) -> Optional[str]:
         """Creates a stylized progress bar for the current song"""
@@ -50,28 +65,28 @@ class PlayerState:
         if not voice_client:
             return None
 
-        # Calculate elapsed time with pause handling
-        start_time = self.song_start_times.get(guild_id, time.time())
+        # Calculate elapsed time with pause handling from a single clock read
+        now = time.monotonic()
+        start_time = self.song_start_times.get(guild_id, now)
         pause_duration = self.pause_durations.get(guild_id, 0)
+        is_paused = voice_client.is_paused()
         
         # If currently paused, add the current pause duration
-        if voice_client.is_paused() and guild_id in self.last_pause_time:
-            pause_duration += time.time() - self.last_pause_time[guild_id]
+        if is_paused and guild_id in self.last_pause_time:
+            pause_duration += now - self.last_pause_time[guild_id]
             
-        elapsed = time.time() - start_time - pause_duration
+        elapsed = now - start_time - pause_duration
         duration = song_info['duration']
-        is_paused = voice_client.is_paused()
 
         # Create progress bar
-        bar_length = 15
-        progress = min(elapsed / duration if duration > 0 else 0, 1.0)
-        filled_length = int(bar_length * progress)
+        progress = max(0.0, min(elapsed / duration if duration > 0 else 0, 1.0))
+        filled_length = int(_BAR_LENGTH * progress)
         
         # Get play/pause emoji based on state
         status_emoji = "⏸️" if is_paused else "▶️"
         
-        # Build the progress bar with new style
-        progress_bar = "▬" * filled_length + "🔘" + "▬" * (bar_length - filled_length)
+        # Look up the prebuilt progress bar
+        progress_bar = _BAR_TEMPLATES[filled_length]
         
         # Format timestamps with padding
         current_time = f"{int(elapsed) // 60:02d}:{int(elapsed) % 60:02d}"
@@ -79,7 +94,7 @@ class PlayerState:
         
         return f"{status_emoji} {progress_bar} `{current_time} / {total_time}`"
 
-    async def extract_song_info(self, query: str) -> Dict[str, Any]:
+    async def extract_song_info(self, query: str) -> Song:
         """Extract song information using YT-DLP with caching"""
         try:
             # Try to get from cache first
@@ -93,17 +108,30 @@ class PlayerState:
             logging.error(f"Error extracting song info: {e}")
             raise
 
-    async def _extract_song_info_impl(self, query: str) -> Dict[str, Any]:
+    async def extract_spotify_song_info(self, song: SpotifyTrack) -> Song:
+        """Extract song information for a Spotify track, cached by its Spotify URL"""
+        # Keyed by track rather than search text so repeat playlists skip extraction; one cache
+        # slot per track, and concurrent requests for the same track share one extraction
+        return await youtube_cache.get_or_compute_key(
+            f"spotify_track:{song.spotify_url}",
+            self._extract_song_info_impl,
+            song.search_query
+        )
+
+    def _blocking_extract(self, query: str) -> Dict[str, Any]:
+        """Run YT-DLP extraction (blocking, called from the thread pool)"""
+        return self._get_ytdl().extract_info(query, download=False)
+
+    async def _extract_song_info_impl(self, query: str) -> Song:
         """Actual implementation of song info extraction using a thread pool"""
         try:
-            # Run the blocking extract_info in a thread pool
-            loop = asyncio.get_event_loop()
             start_time = time.time()
             
             # This runs in a separate thread to avoid blocking the event loop
-            info = await loop.run_in_executor(
+            info = await asyncio.get_running_loop().run_in_executor(
                 youtube_executor, 
-                lambda: self.ytdl.extract_info(query, download=False)
+                self._blocking_extract,
+                query
             )
             
             extraction_time = time.time() - start_time
@@ -113,54 +141,50 @@ class PlayerState:
                 info = info['entries'][0]  # Get first item from playlist
                 
             # Get the highest quality thumbnail available
-            thumbnail = None
-            if info.get('thumbnails'):
-                thumbnails = sorted(
-                    [t for t in info['thumbnails'] if t.get('width')],
-                    key=lambda x: (x.get('width', 0) or 0),
-                    reverse=True
-                )
-                if thumbnails:
-                    thumbnail = thumbnails[0]['url']
+            best = max(
+                (t for t in info.get('thumbnails') or () if t.get('width')),
+                key=lambda t: t['width'],
+                default=None
+            )
             
-            return {
-                'url': info['url'],
-                'title': info['title'],
-                'duration': info.get('duration', 0),
-                'thumbnail': thumbnail or info.get('thumbnail'),
-                'webpage_url': info.get('webpage_url', query),
-                'uploader': info.get('uploader', 'Unknown'),
-                'extracted_at': time.time()  # Add timestamp for cache monitoring
-            }
+            return Song(
+                url=info['url'],
+                title=info['title'],
+                duration=info.get('duration', 0),
+                thumbnail=best['url'] if best else info.get('thumbnail'),
+                webpage_url=info.get('webpage_url', query),
+                uploader=info.get('uploader', 'Unknown'),
+                extracted_at=time.time()
+            )
         except Exception as e:
             logging.error(f"Error in threaded YouTube extraction: {e}")
             raise
 
-    def update_song(self, guild_id: int, song_info: Dict[str, Any], requester: nextcord.Member) -> None:
+    def update_song(self, guild_id: int, song_info: Union[Song, QueuedSong], requester: nextcord.Member) -> None:
         """Update the currently playing song information"""
         self.current_songs[guild_id] = {
-            'title': song_info['title'],
-            'duration': song_info['duration'],
-            'thumbnail': song_info['thumbnail'],
-            'url': song_info['webpage_url'],
-            'uploader': song_info['uploader'],
+            'title': song_info.title,
+            'duration': song_info.duration,
+            'thumbnail': song_info.thumbnail,
+            'url': song_info.webpage_url,
+            'uploader': song_info.uploader,
             'requester': requester
         }
         
-        # Reset timing data
-        self.song_start_times[guild_id] = time.time()
+        # Reset timing data (monotonic clock, only differences are used)
+        self.song_start_times[guild_id] = time.monotonic()
         self.pause_durations[guild_id] = 0
         self.last_pause_time.pop(guild_id, None)
 
     def handle_pause(self, guild_id: int) -> None:
         """Record pause time for accurate progress tracking"""
-        self.last_pause_time[guild_id] = time.time()
+        self.last_pause_time[guild_id] = time.monotonic()
         
     def handle_resume(self, guild_id: int) -> None:
         """Update pause duration when resuming playback"""
         if guild_id in self.last_pause_time:
             pause_time = self.last_pause_time.pop(guild_id)
-            self.pause_durations[guild_id] = self.pause_durations.get(guild_id, 0) + (time.time() - pause_time)
+            self.pause_durations[guild_id] = self.pause_durations.get(guild_id, 0) + (time.monotonic() - pause_time)
 
     def clear_song(self, guild_id: int) -> None:
         """Clear the song information when playback stops"""
@@ -181,14 +205,14 @@ class PlayerState:
         """Remove the voice client for a guild"""
         self.voice_clients.pop(guild_id, None)
 
-    async def create_player(self, song_info: Dict[str, Any]) -> nextcord.FFmpegOpusAudio:
+    async def create_player(self, song_info: Union[Song, QueuedSong]) -> nextcord.FFmpegOpusAudio:
         """Create an FFmpeg player for the song"""
         return await nextcord.FFmpegOpusAudio.from_probe(
-            song_info['url'],
+            song_info.url,
             **self.ffmpeg_options
         )
     
-    async def get_cache_stats(self) -> Dict[str, Any]:
+    async def get_cache_stats(self) -> CacheStats:
         """Get YouTube cache statistics"""
         return youtube_cache.get_stats()
 
@@ -196,7 +220,13 @@ class PlayerState:
 player_state = PlayerState()
 
 # Add a function to clean up the thread pool on shutdown
+_executor_shutdown = False
+
 async def shutdown_player():
-    """Shutdown the player's thread pool"""
+    """Shutdown the player's thread pool (safe to call more than once)"""
+    global _executor_shutdown
+    if _executor_shutdown:
+        return
+    _executor_shutdown = True
     youtube_executor.shutdown(wait=True)
     logging.info("Shutdown YouTube thread pool")
\ No newline at end of file
@@ -1,15 +1,24 @@
-from typing import Dict, List, Optional, Any
+from typing import Deque, Dict, Optional
+import asyncio
 import nextcord
-from collections import defaultdict
+import logging
+from collections import defaultdict, deque
+from itertools import islice
 import random
+from utils.song import Song, QueuedSong
+from utils.embed_factory import EmbedFactory
 
 class QueueManager:
     def __init__(self):
-        # Using defaultdict to automatically initialize empty lists for new guild IDs
-        self.queues: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+        # Using defaultdict to automatically initialize empty deques for new guild IDs
+        self.queues: Dict[int, Deque[QueuedSong]] = defaultdict(deque)
         self.max_queue_size = 500  # Maximum songs per server queue
+        # Set whenever a song is added so playback can wait on songs still being extracted
+        self._song_added: Dict[int, asyncio.Event] = defaultdict(asyncio.Event)
+        # Running total of queued song durations, kept in step with every add/remove
+        self._queue_duration: Dict[int, int] = defaultdict(int)
 
-    def add_song(self, guild_id: int, song_info: Dict[str, Any], requester: nextcord.Member) -> bool:
+    def add_song(self, guild_id: int, song_info: Song, requester: nextcord.Member) -> bool:
         """
         Add a song to the guild's queue
         Returns True if successful, False if queue is full
@@ -17,52 +26,85 @@ class QueueManager:
         if len(self.queues[guild_id]) >= self.max_queue_size:
             return False
 
-        self.queues[guild_id].append({
-            'song_info': song_info,
-            'requester': requester
-        })
+        song = QueuedSong.from_song(song_info, requester)
+        self.queues[guild_id].append(song)
+        self._queue_duration[guild_id] += song.duration
+        self._song_added[guild_id].set()
         return True
+
+    def notify(self, guild_id: int) -> None:
+        """Wake anything waiting on the guild's queue without adding a song"""
+        self._song_added[guild_id].set()
+
+    async def wait_for_song(self, guild_id: int) -> None:
+        """Wait until a song is added to the guild's queue or notify() is called"""
+        event = self._song_added[guild_id]
+        event.clear()
+        await event.wait()
     
     def update_song_metadata(self, guild_id: int, position: int, new_info: dict) -> bool:
         """Update a song's metadata in the queue"""
         try:
-            if 0 <= position < len(self.queues[guild_id]):
-                self.queues[guild_id][position]['song_info'].update({
-                    'url': new_info['url'],
-                    'webpage_url': new_info['webpage_url'],
-                    'thumbnail': new_info.get('thumbnail'),
-                    'uploader': new_info['uploader']
-                })
+            queue = self.queues[guild_id]
+            if 0 <= position < len(queue):
+                # Duration is left alone so the running queue total stays correct
+                queue[position] = queue[position]._replace(
+                    url=new_info['url'],
+                    webpage_url=new_info['webpage_url'],
+                    thumbnail=new_info.get('thumbnail'),
+                    uploader=new_info['uploader']
+                )
                 return True
             return False
         except Exception as e:
             logging.error(f"Error updating song metadata: {e}")
             return False
 
-    def pop_song(self, guild_id: int) -> Optional[Dict[str, Any]]:
+    def pop_song(self, guild_id: int) -> Optional[QueuedSong]:
         """Remove and return the next song in the queue"""
         if not self.queues[guild_id]:
             return None
-        return self.queues[guild_id].pop(0)
+        song = self.queues[guild_id].popleft()
+        self._queue_duration[guild_id] -= song.duration
+        return song
+
+    def push_front(self, guild_id: int, song: QueuedSong) -> None:
+        """Put a popped song back at the front of the queue (ignores the size limit)"""
+        self.queues[guild_id].appendleft(song)
+        self._queue_duration[guild_id] += song.duration
+
+    def pop_n(self, guild_id: int, n: int) -> None:
+        """Remove the next n songs from the queue"""
+        queue = self.queues[guild_id]
+        if n >= len(queue):
+            self.clear_queue(guild_id)
+            return
+        for _ in range(n):
+            self._queue_duration[guild_id] -= queue.popleft().duration
 
     def clear_queue(self, guild_id: int) -> None:
         """Clear the queue for a guild"""
         self.queues[guild_id].clear()
+        self._queue_duration.pop(guild_id, None)
 
     def remove_song(self, guild_id: int, index: int) -> bool:
         """
         Remove a song at a specific index
         Returns True if successful, False if index is invalid
         """
-        try:
-            self.queues[guild_id].pop(index)
-            return True
-        except IndexError:
+        queue = self.queues[guild_id]
+        if not 0 <= index < len(queue):
             return False
+        self._queue_duration[guild_id] -= queue[index].duration
+        del queue[index]
+        return True
 
-    def get_queue(self, guild_id: int) -> List[Dict[str, Any]]:
-        """Get the current queue for a guild"""
-        return self.queues[guild_id].copy()
+    def peek(self, guild_id: int, index: int) -> Optional[QueuedSong]:
+        """Get the song at an index without copying the queue"""
+        queue = self.queues[guild_id]
+        if 0 <= index < len(queue):
+            return queue[index]
+        return None
 
     def get_queue_length(self, guild_id: int) -> int:
         """Get the number of songs in the queue"""
@@ -78,7 +120,8 @@ class QueueManager:
             if not (0 <= old_index < len(queue) and 0 <= new_index < len(queue)):
                 return False
             
-            song = queue.pop(old_index)
+            song = queue[old_index]
+            del queue[old_index]
             queue.insert(new_index, song)
             return True
         except IndexError:
@@ -86,7 +129,12 @@ class QueueManager:
 
     def shuffle_queue(self, guild_id: int) -> None:
         """Shuffle the queue for a guild"""
-        random.shuffle(self.queues[guild_id])
+        # Shuffle a list copy since deque indexing is O(n) away from the ends
+        queue = self.queues[guild_id]
+        songs = list(queue)
+        random.shuffle(songs)
+        queue.clear()
+        queue.extend(songs)
 
     def is_empty(self, guild_id: int) -> bool:
         """Check if the queue is empty"""
@@ -94,7 +142,7 @@ class QueueManager:
 
     def get_queue_duration(self, guild_id: int) -> int:
         """Get the total duration of all songs in the queue in seconds"""
-        return sum(song['song_info']['duration'] for song in self.queues[guild_id])
+        return self._queue_duration[guild_id]
 
     def create_queue_embed(self, guild_id: int, page: int = 1, items_per_page: int = 10) -> nextcord.Embed:
         """Create an embed displaying the current queue"""
@@ -106,8 +154,9 @@ class QueueManager:
                 color=nextcord.Color.gold()
             )
 
-        # Calculate pagination
-        total_pages = (len(queue) + items_per_page - 1) // items_per_page
+        # Calculate pagination (only the visible page is read from the queue below)
+        total_songs = len(queue)
+        total_pages = (total_songs + items_per_page - 1) // items_per_page
         page = max(1, min(page, total_pages))
         start_idx = (page - 1) * items_per_page
         end_idx = start_idx + items_per_page
@@ -119,24 +168,18 @@ class QueueManager:
         )
 
         # Add queue items
-        queue_list = []
-        for idx, item in enumerate(queue[start_idx:end_idx], start=start_idx + 1):
-            song_info = item['song_info']
-            requester = item['requester']
-            duration = f"{song_info['duration'] // 60}:{song_info['duration'] % 60:02d}"
-            
-            queue_list.append(
-                f"`{idx}.` [{song_info['title']}]({song_info['webpage_url']}) | `{duration}`\n"
-                f"┗ Requested by: {requester.mention}"
-            )
-
-        embed.description = "\n\n".join(queue_list)
+        fmt = EmbedFactory.format_duration
+        embed.description = "\n\n".join([
+            f"`{idx}.` [{song.title}]({song.webpage_url}) | `{fmt(song.duration)}`\n"
+            f"┗ Requested by: {song.requester.mention}"
+            for idx, song in enumerate(islice(queue, start_idx, end_idx), start=start_idx + 1)
+        ])
 
         # Add queue information
         total_duration = self.get_queue_duration(guild_id)
         embed.add_field(
             name="Queue Info",
-            value=f"Songs: {len(queue)} | Duration: {total_duration // 60}:{total_duration % 60:02d}",
+            value=f"Songs: {total_songs} | Duration: {EmbedFactory.format_duration(total_duration)}",
             inline=False
         )
 
@@ -0,0 +1,64 @@
+from dataclasses import dataclass
+from typing import NamedTuple, Optional, Tuple
+import nextcord
+
+@dataclass(slots=True)
+class Song:
+    """Playable song information extracted by YT-DLP"""
+    url: str  # Direct audio stream URL
+    title: str
+    duration: int
+    thumbnail: Optional[str]
+    webpage_url: str
+    uploader: str
+    extracted_at: float  # Timestamp for cache monitoring
+
+
+class QueuedSong(NamedTuple):
+    """A song waiting in a guild queue, along with who requested it"""
+    title: str
+    duration: int
+    thumbnail: Optional[str]
+    webpage_url: str
+    url: str  # Direct audio stream URL
+    uploader: str
+    requester: nextcord.Member
+
+    @classmethod
+    def from_song(cls, song: Song, requester: nextcord.Member) -> "QueuedSong":
+        """Snapshot an extracted song for the queue"""
+        return cls(
+            song.title,
+            song.duration or 0,
+            song.thumbnail,
+            song.webpage_url,
+            song.url,
+            song.uploader,
+            requester
+        )
+
+@dataclass(slots=True, frozen=True)
+class SpotifyTrack:
+    """Spotify track metadata used to find and queue the song on YouTube"""
+    name: str
+    artist_names: Tuple[str, ...]
+    duration: int  # Seconds
+    spotify_url: str
+    album: Optional[str]
+    release_date: Optional[str]
+    thumbnail: Optional[str]
+
+    # Derived strings are built on access, since most tracks in a long playlist are never played
+
+    @property
+    def artists(self) -> str:
+        return ", ".join(self.artist_names)
+
+    @property
+    def title(self) -> str:
+        return f"{self.name} - {self.artists}"
+
+    @property
+    def search_query(self) -> str:
+        """Search query used to find the track on YouTube"""
+        return f"{self.name} {self.artists} official audio"
\ No newline at end of file
@@ -1,153 +1,281 @@
 import os
 import re
+import asyncio
 import logging
-from typing import List, Optional, Dict, Any
-from urllib.parse import urlparse
+import functools
+from typing import AsyncIterator, List, Optional, Dict, Any, Callable, Tuple, ClassVar
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
+from spotipy.exceptions import SpotifyException
+from aiolimiter import AsyncLimiter
 import nextcord
 from utils.cache_manager import spotify_cache, SPOTIFY_CACHE
 from utils.embed_factory import EmbedFactory
+from utils.song import SpotifyTrack
+
+# Matches any supported Spotify link or URI in a single scan; the matching group names the URL type
+URL_TYPE_RE = re.compile(
+    r'(?P<track>spotify:track:|https?://[a-z]+\.spotify\.com/track/)'
+    r'|(?P<album>spotify:album:|https?://[a-z]+\.spotify\.com/album/)'
+    r'|(?P<playlist>spotify:playlist:|https?://[a-z]+\.spotify\.com/playlist/)'
+    r'|(?P<artist>spotify:artist:|https?://[a-z]+\.spotify\.com/artist/)'
+)
+
+# Captures the ID after the type segment, stopping before any ?si= query string
+_ID_RE = re.compile(r'(?:track|album|playlist|artist)[:/]([A-Za-z0-9]+)')
+
+@functools.lru_cache(maxsize=4096)
+def _format_track_cached(
+    track_id: Optional[str],
+    name: str,
+    artist_names: Tuple[str, ...],
+    duration_ms: int,
+    spotify_url: str,
+    album_name: Optional[str],
+    release_date: Optional[str],
+    thumbnail: Optional[str]
+) -> SpotifyTrack:
+    """Build the queue record for a track (memoized, tracks recur across playlists)"""
+    return SpotifyTrack(
+        name=name,
+        artist_names=artist_names,
+        duration=round(duration_ms / 1000),  # Convert to seconds
+        spotify_url=spotify_url,
+        album=album_name,
+        release_date=release_date,
+        thumbnail=thumbnail
+    )
 
 class SpotifyManager:
+    # Embed styling shared by every Spotify embed
+    _SPOTIFY_GREEN: ClassVar[nextcord.Color] = nextcord.Color.from_rgb(30, 215, 96)
+    _SPOTIFY_FOOTER_ICON: ClassVar[str] = "https://i.imgur.com/q4qNzb9.png"
+
+    # Cache TTL per URL type: tracks and albums don't change, artist top tracks shift weekly,
+    # and playlists are edited often enough that a listing should only be reused briefly
+    _CACHE_TTLS: ClassVar[Dict[str, int]] = {
+        'track': 7 * 86400,
+        'album': 7 * 86400,
+        'artist': 86400,
+        'playlist': 600
+    }
+
     def __init__(self):
         self.client_id = os.getenv("SPOTIFY_CLIENT_ID")
         self.client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
         self._spotify_client: Optional[spotipy.Spotify] = None
         
-        # URL pattern matching
-        self.url_patterns = {
-            'track': r'spotify:track:|https?://[a-z]+\.spotify\.com/track/',
-            'album': r'spotify:album:|https?://[a-z]+\.spotify\.com/album/',
-            'playlist': r'spotify:playlist:|https?://[a-z]+\.spotify\.com/playlist/',
-            'artist': r'spotify:artist:|https?://[a-z]+\.spotify\.com/artist/'
-        }
-
-    @property
-    def spotify_client(self) -> spotipy.Spotify:
-        """Lazy initialization of Spotify client"""
-        if not self._spotify_client:
-            if not (self.client_id and self.client_secret):
-                raise ValueError("Spotify credentials not configured")
-            
+        # Rate limiting shared by every Spotify API call: 10 requests per 10 seconds
+        self._rate_limiter = AsyncLimiter(max_rate=10, time_period=10)
+        self.max_rate_limit_retries = 3
+        self.rate_limited_count = 0  # Number of HTTP 429 responses received
+        
+        # Listings currently being paged, resolved with the full listing so concurrent callers share it
+        self._pending_listings: Dict[str, asyncio.Future] = {}
+        
+        # Build the client up front so every call shares one connection pool
+        if self.client_id and self.client_secret:
             try:
-                # For client credentials flow, we don't need cache_path
-                auth_manager = SpotifyClientCredentials(
-                    client_id=self.client_id,
-                    client_secret=self.client_secret
-                )
-                
-                self._spotify_client = spotipy.Spotify(auth_manager=auth_manager)
-                logging.info(f"Initialized Spotify client")
+                self._spotify_client = self._create_client()
             except Exception as e:
                 logging.error(f"Failed to initialize Spotify client: {e}")
-                raise
-                
+
+    def _create_client(self) -> spotipy.Spotify:
+        """Create the Spotify client on a pooled session sized for concurrent page fetches"""
+        session = requests.Session()
+        # spotipy skips its own retry setup when handed a session, so retry server errors here;
+        # 429 is left to _call_api, which honors Retry-After
+        retry = Retry(
+            total=3,
+            status_forcelist=(500, 502, 503, 504),
+            backoff_factor=0.3,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=20, pool_maxsize=20, max_retries=retry)
+        session.mount("https://", adapter)
+        
+        # For client credentials flow, we don't need cache_path
+        auth_manager = SpotifyClientCredentials(
+            client_id=self.client_id,
+            client_secret=self.client_secret,
+            requests_session=session
+        )
+        
+        client = spotipy.Spotify(auth_manager=auth_manager, requests_session=session)
+        logging.info("Initialized Spotify client")
+        return client
+
+    @property
+    def spotify_client(self) -> spotipy.Spotify:
+        """The Spotify client, built at startup when credentials are configured"""
+        if self._spotify_client is None:
+            raise ValueError("Spotify credentials not configured")
         return self._spotify_client
 
+    async def _call_api(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking spotipy call in a worker thread, rate limited and retried on HTTP 429"""
+        for attempt in range(self.max_rate_limit_retries + 1):
+            async with self._rate_limiter:
+                try:
+                    return await asyncio.to_thread(func, *args, **kwargs)
+                except SpotifyException as e:
+                    if e.http_status != 429 or attempt == self.max_rate_limit_retries:
+                        raise
+                    retry_after = float((e.headers or {}).get('Retry-After', 1))
+            
+            self.rate_limited_count += 1
+            logging.warning(f"Spotify rate limit hit, retrying in {retry_after:.0f}s (attempt {attempt + 1}/{self.max_rate_limit_retries})")
+            await asyncio.sleep(retry_after)
+
     def is_spotify_url(self, url: str) -> bool:
         """Check if the URL is a Spotify URL"""
-        return any(
-            re.search(pattern, url)
-            for pattern in self.url_patterns.values()
-        )
+        return URL_TYPE_RE.search(url) is not None
 
     def get_url_type(self, url: str) -> Optional[str]:
         """Determine the type of Spotify URL"""
-        for url_type, pattern in self.url_patterns.items():
-            if re.search(pattern, url):
-                return url_type
-        return None
+        match = URL_TYPE_RE.search(url)
+        return match.lastgroup if match else None
 
     def get_spotify_id(self, url: str) -> str:
         """Extract Spotify ID from URL"""
-        parsed = urlparse(url)
-        return parsed.path.split('/')[-1]
+        match = _ID_RE.search(url)
+        return match.group(1) if match else ''
 
-    async def get_songs_from_url(self, url: str) -> List[Dict[str, Any]]:
+    async def get_songs_from_url(self, url: str) -> List[SpotifyTrack]:
         """Get song information from various Spotify URL types with caching"""
+        return [song async for song in self.iter_songs_from_url(url)]
+
+    async def iter_songs_from_url(self, url: str) -> AsyncIterator[SpotifyTrack]:
+        """Yield songs from a Spotify URL as each page of results arrives, with caching"""
+        # Key on the parsed link so share links differing only in query params share an entry
+        url_type = self.get_url_type(url)
+        cache_key = f"spotify_songs:{url_type}:{self.get_spotify_id(url)}"
+        cached = spotify_cache.get(cache_key)
+        
+        # Someone else is already paging this listing: wait for it instead of fetching it twice
+        while cached is None and (pending := self._pending_listings.get(cache_key)) is not None:
+            try:
+                cached = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The fetch stopped early or failed rather than us being cancelled: fetch it ourselves
+                if pending.cancelled() and not asyncio.current_task().cancelling():
+                    continue
+                raise
+        
+        if cached is not None:
+            for song in cached:
+                yield song
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending_listings[cache_key] = future
         try:
-            # Generate cache key from URL
-            return await spotify_cache.get_or_compute(self._get_songs_from_url_impl, url)
-        except Exception as e:
-            logging.error(f"Error in get_songs_from_url with caching: {e}")
-            # Fall back to direct implementation if caching fails
-            return await self._get_songs_from_url_impl(url)
+            songs = []
+            async for song in self._iter_songs_from_url_impl(url):
+                songs.append(song)
+                yield song
+            
+            # Only complete listings are cached; a tuple keeps callers from mutating the cached copy
+            listing = tuple(songs)
+            spotify_cache.set(cache_key, listing, ttl=self._CACHE_TTLS.get(url_type))
+            future.set_result(listing)
+        finally:
+            # Closed early or failed: waiting callers fall back to fetching the listing themselves
+            if not future.done():
+                future.cancel()
+            if self._pending_listings.get(cache_key) is future:
+                del self._pending_listings[cache_key]
 
-    async def _get_songs_from_url_impl(self, url: str) -> List[Dict[str, Any]]:
+    async def _iter_songs_from_url_impl(self, url: str) -> AsyncIterator[SpotifyTrack]:
         """Implementation of fetching songs from Spotify URL"""
         url_type = self.get_url_type(url)
         if not url_type:
             raise ValueError("Invalid Spotify URL")
 
         spotify_id = self.get_spotify_id(url)
-        songs = []
 
         if url_type == 'track':
-            track = self.spotify_client.track(spotify_id)
-            songs.append(self._format_track(track))
+            track = await self._call_api(self.spotify_client.track, spotify_id)
+            yield self._format_track(track)
 
         elif url_type == 'album':
-            album = self.spotify_client.album_tracks(spotify_id)
-            for track in album['items']:
-                track['album'] = self.spotify_client.album(spotify_id)
-                songs.append(self._format_track(track))
+            # One album request returns the album details and the first page of tracks
+            album = await self._call_api(self.spotify_client.album, spotify_id)
+            # Album track listings omit album details, so attach them from the album itself
+            async for track in self._iter_pages(self.spotify_client.album_tracks, spotify_id, album['tracks']):
+                track['album'] = album
+                yield self._format_track(track)
 
         elif url_type == 'playlist':
-            results = self.spotify_client.playlist_tracks(spotify_id)
-            while results:
-                for item in results['items']:
-                    if item['track']:
-                        songs.append(self._format_track(item['track']))
-                if results['next']:
-                    results = self.spotify_client.next(results)
-                else:
-                    break
+            first_page = await self._call_api(self.spotify_client.playlist_tracks, spotify_id)
+            async for item in self._iter_pages(self.spotify_client.playlist_tracks, spotify_id, first_page):
+                if item['track']:
+                    yield self._format_track(item['track'])
 
         elif url_type == 'artist':
-            top_tracks = self.spotify_client.artist_top_tracks(spotify_id)
+            top_tracks = await self._call_api(self.spotify_client.artist_top_tracks, spotify_id)
             for track in top_tracks['tracks']:
-                songs.append(self._format_track(track))
+                yield self._format_track(track)
+
+    async def _iter_pages(self, func: Callable, spotify_id: str, first_page: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every item in order, fetching the pages after first_page concurrently"""
+        limit = first_page['limit']
+        semaphore = asyncio.Semaphore(10)  # The shared rate limiter still caps requests per second
+
+        async def fetch_page(offset: int) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._call_api(func, spotify_id, limit=limit, offset=offset)
 
-        return songs
+        # The first page reports the total, so every remaining offset is known up front
+        offsets = range(first_page['offset'] + limit, first_page['total'], limit)
+        tasks = [asyncio.create_task(fetch_page(offset)) for offset in offsets]
+        try:
+            # Items from the first page go out while the remaining pages load
+            for item in first_page['items']:
+                yield item
+            for task in tasks:
+                for item in (await task)['items']:
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
 
-    def _format_track(self, track: Dict[str, Any]) -> Dict[str, Any]:
+    def _format_track(self, track: Dict[str, Any]) -> SpotifyTrack:
         """Format track information for queue system"""
-        artists = ", ".join(artist['name'] for artist in track['artists'])
-        
-        # Format search query for YouTube
-        search_query = f"{track['name']} {artists} official audio"
-        
-        return {
-            'title': f"{track['name']} - {artists}",
-            'search_query': search_query,
-            'duration': round(track['duration_ms'] / 1000),  # Convert to seconds
-            'spotify_url': track['external_urls']['spotify'],
-            'artists': artists,
-            'album': track['album']['name'] if 'album' in track else None,
-            'release_date': track['album']['release_date'] if 'album' in track else None,
-            'thumbnail': track['album']['images'][0]['url'] if 'album' in track and track['album']['images'] else None
-        }
-
-    def create_spotify_embed(self, track_info: Dict[str, Any]) -> nextcord.Embed:
+        album = track.get('album')
+        return _format_track_cached(
+            track.get('id'),
+            track['name'],
+            tuple(artist['name'] for artist in track['artists']),
+            track['duration_ms'],
+            track['external_urls']['spotify'],
+            album['name'] if album else None,
+            album['release_date'] if album else None,
+            album['images'][0]['url'] if album and album['images'] else None
+        )
+
+    def create_spotify_embed(self, track_info: SpotifyTrack) -> nextcord.Embed:
         """Create an embed for Spotify track information"""
         embed = EmbedFactory.create_basic_embed(
-            title=track_info['title'],
-            description=f"[Open on Spotify]({track_info['spotify_url']})",
-            color=nextcord.Color.from_rgb(30, 215, 96),  # Spotify green
-            thumbnail=track_info['thumbnail']
+            title=track_info.title,
+            description=f"[Open on Spotify]({track_info.spotify_url})",
+            color=self._SPOTIFY_GREEN,
+            thumbnail=track_info.thumbnail
         )
             
-        embed.add_field(name="Artists", value=track_info['artists'], inline=True)
-        if track_info['album']:
-            embed.add_field(name="Album", value=track_info['album'], inline=True)
-        if track_info['release_date']:
-            embed.add_field(name="Release Date", value=track_info['release_date'], inline=True)
+        embed.add_field(name="Artists", value=track_info.artists, inline=True)
+        if track_info.album:
+            embed.add_field(name="Album", value=track_info.album, inline=True)
+        if track_info.release_date:
+            embed.add_field(name="Release Date", value=track_info.release_date, inline=True)
             
-        duration = f"{track_info['duration'] // 60}:{track_info['duration'] % 60:02d}"
-        embed.add_field(name="Duration", value=duration, inline=True)
+        mins, secs = divmod(track_info.duration, 60)
+        embed.add_field(name="Duration", value=f"{mins}:{secs:02d}", inline=True)
         
-        embed.set_footer(text="Powered by Spotify", icon_url="https://i.imgur.com/q4qNzb9.png")
+        embed.set_footer(text="Powered by Spotify", icon_url=self._SPOTIFY_FOOTER_ICON)
         
         return embed
 
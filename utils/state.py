@@ -0,0 +1,26 @@
+import functools
+from typing import Set
+import nextcord
+from utils.embed_factory import EmbedFactory
+
+# Guilds that are still adding songs from a Spotify link in the background
+processing_guilds: Set[int] = set()
+
+def require_idle(func):
+    """Reject a slash command while its guild is still processing songs"""
+    @functools.wraps(func)
+    async def wrapper(self, interaction: nextcord.Interaction, *args, **kwargs):
+        if interaction.guild_id in processing_guilds:
+            embed = EmbedFactory.create_action_embed(
+                "wait",
+                "Still processing songs... Please try again in a moment.",
+                success=False,
+                user=interaction.user
+            )
+            if interaction.response.is_done():
+                await interaction.followup.send(embed=embed)
+            else:
+                await interaction.response.send_message(embed=embed)
+            return
+        return await func(self, interaction, *args, **kwargs)
+    return wrapper
\ No newline at end of file
@@ -1,29 +1,43 @@
 import asyncio
+import functools
 import logging
-import time
 import nextcord
-from typing import Optional, Dict, Any, List
+from aiolimiter import AsyncLimiter
+from collections import defaultdict, deque
+from itertools import islice
+from typing import Optional, Dict, Any, List, Deque, Union
 from .player import player_state
 from .queue import song_queue
 from .embed_factory import EmbedFactory
+from .song import Song, QueuedSong
+from .state import processing_guilds
 
 class VoiceManager:
     def __init__(self):
         self.bot: Optional[nextcord.Client] = None
-        self._inactivity_timeouts: Dict[int, asyncio.Task] = {}
+        self._inactivity_timeouts: Dict[int, asyncio.TimerHandle] = {}
+        # Running inactivity checks, referenced here so they aren't garbage collected mid-run
+        self._inactivity_tasks: Dict[int, asyncio.Task] = {}
+        self.inactivity_timeout = 300  # Seconds idle before leaving an empty channel
+        # Non-bot members in the bot's voice channel, kept current by voice state events
+        self._human_counts: Dict[int, int] = {}
         self.command_channels: Dict[int, nextcord.TextChannel] = {}
         self.reconnect_attempts: Dict[int, int] = {}
         self.max_reconnect_attempts = 3  # Maximum reconnection attempts
         self.reconnect_backoff = 5  # Base seconds to wait between reconnection attempts
         self.reconnect_tasks: Dict[int, asyncio.Task] = {}
+        # Background task queueing songs from a Spotify link, one current run per guild
+        self.processing_tasks: Dict[int, asyncio.Task] = {}
         
         # Store the last 5 played songs for resilience
-        self.recent_songs: Dict[int, List[Dict[str, Any]]] = {}
         self.max_recent_songs = 5
+        self.recent_songs: Dict[int, Deque[Dict[str, Any]]] = defaultdict(
+            lambda: deque(maxlen=self.max_recent_songs)
+        )
         
         # Rate limiting protection
-        self.last_api_call: Dict[str, float] = {}
-        self.min_api_interval = 0.5  # Seconds between API calls
+        # Leaky bucket shared by voice joins and extractions: bursts of 4, then 4 per second
+        self._rate_limiter = AsyncLimiter(max_rate=4, time_period=1)
 
     def setup(self, bot: nextcord.Client) -> None:
         """Initialize the voice manager with the bot instance"""
@@ -51,11 +65,12 @@ class VoiceManager:
 
         try:
             # Rate limiting protection
-            await self._respect_rate_limit('join_voice')
+            await self._rate_limiter.acquire()
             
             # Connect to voice channel
             voice_client = await interaction.user.voice.channel.connect()
             player_state.update_voice_client(interaction.guild_id, voice_client)
+            self._count_humans(interaction.guild_id, voice_client.channel)
             
             # Store the channel for reconnection purposes
             self.command_channels[interaction.guild_id] = interaction.channel
@@ -63,8 +78,8 @@ class VoiceManager:
             # Reset reconnection counter on successful connection
             self.reconnect_attempts[interaction.guild_id] = 0
             
-            # Start inactivity checker
-            self._start_inactivity_checker(interaction.guild_id)
+            # Start inactivity timer
+            self._schedule_inactivity_check(interaction.guild_id)
             
             return voice_client
         except Exception as e:
@@ -79,60 +94,64 @@ class VoiceManager:
             )
             return None
 
-    async def _respect_rate_limit(self, action_key: str) -> None:
-        """Ensure we don't exceed API rate limits"""
-        now = time.time()
-        last_call = self.last_api_call.get(action_key, 0)
-        time_since_last = now - last_call
-        
-        if time_since_last < self.min_api_interval:
-            # Wait to respect rate limit
-            await asyncio.sleep(self.min_api_interval - time_since_last)
+    def _schedule_inactivity_check(self, guild_id: int) -> None:
+        """(Re)start the timer that checks for voice channel inactivity"""
+        handle = self._inactivity_timeouts.get(guild_id)
+        if handle:
+            handle.cancel()
         
-        # Update the last call time
-        self.last_api_call[action_key] = time.time()
-
-    def _start_inactivity_checker(self, guild_id: int) -> None:
-        """Start checking for voice channel inactivity"""
-        if guild_id in self._inactivity_timeouts:
-            self._inactivity_timeouts[guild_id].cancel()
-        
-        self._inactivity_timeouts[guild_id] = asyncio.create_task(
-            self._check_inactivity(guild_id)
+        self._inactivity_timeouts[guild_id] = asyncio.get_running_loop().call_later(
+            self.inactivity_timeout,
+            self._start_inactivity_check,
+            guild_id
         )
 
+    def _start_inactivity_check(self, guild_id: int) -> None:
+        """Timer callback: run the inactivity check as a task we keep a reference to"""
+        task = asyncio.create_task(self._check_inactivity(guild_id))
+        self._inactivity_tasks[guild_id] = task
+
+        def discard(finished: asyncio.Task) -> None:
+            if self._inactivity_tasks.get(guild_id) is finished:
+                del self._inactivity_tasks[guild_id]
+
+        task.add_done_callback(discard)
+
     async def _check_inactivity(self, guild_id: int) -> None:
-        """Check for voice channel inactivity and disconnect if inactive"""
+        """Disconnect if idle with no listeners; the timer is re-armed by the next song end"""
+        self._inactivity_timeouts.pop(guild_id, None)
         try:
-            while True:
-                await asyncio.sleep(300)  # Check every 5 minutes
-                voice_client = player_state.voice_clients.get(guild_id)
+            voice_client = player_state.voice_clients.get(guild_id)
+            
+            # Nothing to do if disconnected, or playing (the song end restarts the timer)
+            if not voice_client or not voice_client.is_connected() or voice_client.is_playing():
+                return
                 
-                if not voice_client or not voice_client.is_connected():
-                    break
-                    
-                if not voice_client.is_playing() and not voice_client.is_paused():
-                    # Get number of human users in the channel
-                    members = voice_client.channel.members
-                    human_members = [m for m in members if not m.bot]
-                    
-                    if len(human_members) == 0:
-                        await self.disconnect(guild_id)
-                        break
-        except asyncio.CancelledError:
-            pass
+            if not voice_client.is_paused():
+                # Leave if nobody but bots is listening
+                if self._human_counts.get(guild_id, 0) == 0:
+                    await self.disconnect(guild_id)
+                    return
+            
+            # Still idle or paused with listeners present, check again later
+            self._schedule_inactivity_check(guild_id)
         except Exception as e:
             logging.error(f"Error in inactivity checker: {e}")
-        finally:
-            self._inactivity_timeouts.pop(guild_id, None)
 
     async def on_voice_state_update(self, member: nextcord.Member, before: nextcord.VoiceState, after: nextcord.VoiceState):
         """Handle voice state updates for resilience"""
-        # Skip if not the bot or the bot hasn't moved
+        guild_id = member.guild.id
+        
+        # Track listeners joining or leaving the bot's channel
         if member.id != self.bot.user.id:
+            if not member.bot and before.channel != after.channel and guild_id in self._human_counts:
+                voice_client = player_state.voice_clients.get(guild_id)
+                if voice_client:
+                    if before.channel == voice_client.channel:
+                        self._human_counts[guild_id] -= 1
+                    if after.channel == voice_client.channel:
+                        self._human_counts[guild_id] += 1
             return
-            
-        guild_id = member.guild.id
         
         # Detect disconnection (bot was in a channel before but not after)
         if before.channel and not after.channel:
@@ -154,6 +173,7 @@ class VoiceManager:
             voice_client = member.guild.voice_client
             if voice_client:
                 player_state.update_voice_client(guild_id, voice_client)
+            self._count_humans(guild_id, after.channel)
 
     def _attempt_reconnection(self, guild_id: int, channel: nextcord.VoiceChannel) -> None:
         """Start a reconnection attempt task"""
@@ -171,18 +191,11 @@ class VoiceManager:
         # Get the current attempts count or initialize to 0
         attempts = self.reconnect_attempts.get(guild_id, 0)
         
-        # Store the current song and queue state before reconnecting
+        # Store the current song before reconnecting (the queue is left in place)
         current_song = player_state.get_song(guild_id)
-        current_queue = song_queue.get_queue(guild_id)
         
         # Add current song to recent songs if available
-        if current_song:
-            if guild_id not in self.recent_songs:
-                self.recent_songs[guild_id] = []
-            self.recent_songs[guild_id].insert(0, current_song)
-            # Trim to max size
-            if len(self.recent_songs[guild_id]) > self.max_recent_songs:
-                self.recent_songs[guild_id] = self.recent_songs[guild_id][:self.max_recent_songs]
+        self._push_recent(guild_id, current_song)
         
         # Get the notification channel
         notification_channel = self.command_channels.get(guild_id)
@@ -207,6 +220,7 @@ class VoiceManager:
                     # Connect to the voice channel
                     voice_client = await channel.connect()
                     player_state.update_voice_client(guild_id, voice_client)
+                    self._count_humans(guild_id, channel)
                     
                     # Notify about reconnection
                     if notification_channel:
@@ -223,24 +237,8 @@ class VoiceManager:
                         # Get the song info again
                         song_info = await player_state.extract_song_info(current_song['url'])
                         
-                        # Create player
-                        player = await player_state.create_player(song_info)
-                        
-                        # Play the song
-                        voice_client.play(
-                            player,
-                            after=lambda e: asyncio.run_coroutine_threadsafe(
-                                self._handle_song_end(guild_id, e is not None),
-                                self.bot.loop
-                            )
-                        )
-                        
-                        # Restore the player state
-                        player_state.update_song(
-                            guild_id,
-                            song_info,
-                            current_song['requester']
-                        )
+                        # Play the song and restore the player state
+                        await self._start_playback(guild_id, voice_client, song_info, current_song['requester'])
                         
                         # Notify about resumed playback
                         if notification_channel:
@@ -255,8 +253,8 @@ class VoiceManager:
                     # Reset reconnection counter on successful connection
                     self.reconnect_attempts[guild_id] = 0
                     
-                    # Start inactivity checker
-                    self._start_inactivity_checker(guild_id)
+                    # Start inactivity timer
+                    self._schedule_inactivity_check(guild_id)
                     
                     # Successfully reconnected
                     return
@@ -308,7 +306,7 @@ class VoiceManager:
 
         try:
             # Rate limiting protection
-            await self._respect_rate_limit('extract_info')
+            await self._rate_limiter.acquire()
             
             # Ensure bot is in voice channel
             voice_client = player_state.voice_clients.get(interaction.guild_id)
@@ -322,17 +320,6 @@ class VoiceManager:
 
             # Extract song info
             song_info = await player_state.extract_song_info(query)
-            
-            # Create player
-            player = await player_state.create_player(song_info)
-            
-            def after_playing(error: Optional[Exception]) -> None:
-                if error:
-                    logging.error(f"Error playing song: {error}")
-                asyncio.run_coroutine_threadsafe(
-                    self._handle_song_end(interaction.guild_id, error is not None),
-                    self.bot.loop
-                )
 
             # If already playing, add to queue
             if voice_client.is_playing() or voice_client.is_paused():
@@ -351,8 +338,7 @@ class VoiceManager:
                 return
 
             # Play the song
-            voice_client.play(player, after=after_playing)
-            player_state.update_song(interaction.guild_id, song_info, interaction.user)
+            await self._start_playback(interaction.guild_id, voice_client, song_info, interaction.user)
             
             # Create embed using the factory
             embed = EmbedFactory.create_song_embed(
@@ -380,17 +366,14 @@ class VoiceManager:
             logging.error("VoiceManager not properly initialized!")
             return
 
+        # Playback stopped, so restart the inactivity timer
+        self._schedule_inactivity_check(guild_id)
+        
         # Get the current song before clearing it
         current_song = player_state.get_song(guild_id)
         
         # Add current song to recent songs if available
-        if current_song:
-            if guild_id not in self.recent_songs:
-                self.recent_songs[guild_id] = []
-            self.recent_songs[guild_id].insert(0, current_song)
-            # Trim to max size
-            if len(self.recent_songs[guild_id]) > self.max_recent_songs:
-                self.recent_songs[guild_id] = self.recent_songs[guild_id][:self.max_recent_songs]
+        self._push_recent(guild_id, current_song)
 
         # Clear current song info
         player_state.clear_song(guild_id)
@@ -408,8 +391,11 @@ class VoiceManager:
                     )
                 )
         
-        # Get next song from queue
+        # Get next song from queue, waiting on songs still being extracted from a Spotify link
         next_song = song_queue.pop_song(guild_id)
+        while not next_song and guild_id in processing_guilds:
+            await song_queue.wait_for_song(guild_id)
+            next_song = song_queue.pop_song(guild_id)
         if not next_song:
             return
             
@@ -417,35 +403,22 @@ class VoiceManager:
         if not voice_client or not voice_client.is_connected():
             return
 
+        # A /play issued while we were waiting may have started playback already
+        if voice_client.is_playing() or voice_client.is_paused():
+            song_queue.push_front(guild_id, next_song)
+            return
+
         try:
             # Rate limiting protection
-            await self._respect_rate_limit('extract_info')
-            
-            song_info = next_song['song_info']
-            
-            # If this is a search query entry (from Spotify), get the YouTube info
-            if song_info.get('search_query') and not song_info.get('url'):
-                song_info = await player_state.extract_song_info(song_info['search_query'])
-
-            # Create new player for next song
-            player = await player_state.create_player(song_info)
+            await self._rate_limiter.acquire()
             
-            def after_playing(error: Optional[Exception]) -> None:
-                if error:
-                    logging.error(f"Error playing next song: {error}")
-                asyncio.run_coroutine_threadsafe(
-                    self._handle_song_end(guild_id, error is not None),
-                    self.bot.loop
-                )
-
             # Play the next song
-            voice_client.play(player, after=after_playing)
-            player_state.update_song(guild_id, song_info, next_song['requester'])
+            await self._start_playback(guild_id, voice_client, next_song, next_song.requester)
             
             # Create embed using the factory
             embed = EmbedFactory.create_song_embed(
-                song_info,
-                next_song['requester'],
+                next_song,
+                next_song.requester,
                 is_now_playing=True
             )
 
@@ -456,7 +429,7 @@ class VoiceManager:
                 await channel.send(embed=embed)
             else:
                 # Fallback to the system channel
-                guild = next_song['requester'].guild
+                guild = next_song.requester.guild
                 channel = guild.system_channel
                 if channel:
                     await channel.send(embed=embed)
@@ -466,6 +439,57 @@ class VoiceManager:
             # Try the next song in queue if available
             asyncio.create_task(self._handle_song_end(guild_id, True))
 
+    def _count_humans(self, guild_id: int, channel: nextcord.VoiceChannel) -> None:
+        """Count non-bot members once when the bot enters a channel"""
+        self._human_counts[guild_id] = sum(1 for m in channel.members if not m.bot)
+
+    def _push_recent(self, guild_id: int, song: Optional[Dict[str, Any]]) -> None:
+        """Remember a finished song (the deque's maxlen drops the oldest automatically)"""
+        if song:
+            self.recent_songs[guild_id].appendleft(song)
+
+    async def _start_playback(
+        self,
+        guild_id: int,
+        voice_client: nextcord.VoiceClient,
+        song_info: Union[Song, QueuedSong],
+        requester: nextcord.Member
+    ) -> None:
+        """Create a player for the song, start it and record it as the current song"""
+        player = await player_state.create_player(song_info)
+        voice_client.play(player, after=functools.partial(self._after_playing, guild_id))
+        player_state.update_song(guild_id, song_info, requester)
+
+    def _after_playing(self, guild_id: int, error: Optional[Exception]) -> None:
+        """Playback-finished callback (runs on the voice thread), hands off to the event loop"""
+        if error:
+            logging.error(f"Error playing song: {error}")
+        asyncio.run_coroutine_threadsafe(
+            self._handle_song_end(guild_id, error is not None),
+            self.bot.loop
+        )
+
+    def track_processing(self, guild_id: int, task: asyncio.Task) -> None:
+        """Record the task now queueing songs from a Spotify link for the guild"""
+        self.processing_tasks[guild_id] = task
+        processing_guilds.add(guild_id)
+
+    def finish_processing(self, guild_id: int) -> None:
+        """Clear processing state, but only if the calling task is still the guild's current run"""
+        if self.processing_tasks.get(guild_id) is not asyncio.current_task():
+            return
+        del self.processing_tasks[guild_id]
+        processing_guilds.discard(guild_id)
+        song_queue.notify(guild_id)
+
+    def cancel_processing(self, guild_id: int) -> None:
+        """Stop queueing songs from a Spotify link and wake playback waiting on them"""
+        task = self.processing_tasks.pop(guild_id, None)
+        if task and not task.done():
+            task.cancel()
+        processing_guilds.discard(guild_id)
+        song_queue.notify(guild_id)
+
     async def disconnect(self, guild_id: int) -> None:
         """Disconnect from voice channel and clean up"""
         voice_client = player_state.voice_clients.get(guild_id)
@@ -473,14 +497,21 @@ class VoiceManager:
             await voice_client.disconnect()
         
         # Clean up
+        self.cancel_processing(guild_id)
         player_state.clear_song(guild_id)
         player_state.remove_voice_client(guild_id)
         song_queue.clear_queue(guild_id)
+        self._human_counts.pop(guild_id, None)
         
-        # Cancel inactivity checker
+        # Cancel inactivity timer
         if guild_id in self._inactivity_timeouts:
             self._inactivity_timeouts[guild_id].cancel()
             self._inactivity_timeouts.pop(guild_id)
+        
+        # Cancel a running inactivity check, unless it is the one disconnecting us
+        inactivity_task = self._inactivity_tasks.pop(guild_id, None)
+        if inactivity_task and inactivity_task is not asyncio.current_task():
+            inactivity_task.cancel()
             
         # Cancel any reconnection attempts
         if guild_id in self.reconnect_tasks and not self.reconnect_tasks[guild_id].done():
@@ -489,8 +520,7 @@ class VoiceManager:
 
     async def get_recently_played(self, guild_id: int, limit: int = 10) -> List[Dict[str, Any]]:
         """Get the recently played songs"""
-        recent = self.recent_songs.get(guild_id, [])
-        return recent[:min(limit, len(recent))]
+        return list(islice(self.recent_songs.get(guild_id, ()), limit))
 
 # Create global instance
 voice_manager = VoiceManager()
\ No newline at end of file